@@ -0,0 +1,25 @@
+"""
+pytest-benchmark version of the cases in cases.py. Run it explicitly, e.g.
+
+    pytest scripts/benchmarks/bench_pipeline.py --benchmark-only
+    WIKI_BENCH_SCALES=small,medium,large pytest scripts/benchmarks/bench_pipeline.py
+
+Needs the ``pytest-benchmark`` plugin; ``python -m benchmarks`` needs nothing extra.
+"""
+
+import os
+
+import pytest
+
+from benchmarks.cases import CASES, SCALES
+
+BENCH_SCALES = os.environ.get("WIKI_BENCH_SCALES", "small,medium").split(",")
+
+
+@pytest.mark.parametrize("scale", BENCH_SCALES)
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_benchmark(benchmark, case, scale, tmp_path):
+    state = case.setup(SCALES[scale], tmp_path)
+    items = benchmark(case.run, state)
+    benchmark.extra_info["items"] = items
+    benchmark.extra_info["unit"] = case.unit
@@ -0,0 +1,232 @@
+"""
+Benchmark cases for the hot paths of the scraper, converter, network and
+analysis code. Each case builds its input from the synthetic export in
+``setup`` and returns the number of items it processed from ``run``, so the
+runner can report throughput as items per second.
+
+The code under test is imported inside ``setup``, which lets the runner point
+``sys.path`` at an older checkout before the first case runs.
+"""
+
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from .synthetic import ExportSpec, generate_export, iter_revisions, render_revision
+
+# number of revisions generated at each scale
+SCALES = {"small": 100, "medium": 1000, "large": 5000}
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable  # (revisions: int, workdir: Path) -> state
+    run: Callable  # (state) -> items processed
+    unit: str = "revisions"
+
+
+def _spec(revisions: int) -> ExportSpec:
+    return ExportSpec(revisions=revisions, seed=42)
+
+
+def _revision_strings(revisions: int) -> list:
+    return [render_revision(revision).strip() for revision in iter_revisions(_spec(revisions))]
+
+
+# --- scraper -----------------------------------------------------------------
+
+
+def setup_parse_mediawiki_revisions(revisions: int, workdir: Path):
+    from data_scraper.download_wiki_revisions import parse_mediawiki_revisions
+
+    return parse_mediawiki_revisions, generate_export(_spec(revisions))
+
+
+def run_parse_mediawiki_revisions(state) -> int:
+    parse_mediawiki_revisions, xml_content = state
+    return sum(1 for _ in parse_mediawiki_revisions(xml_content))
+
+
+def setup_construct_path(revisions: int, workdir: Path):
+    from data_scraper.download_wiki_revisions import construct_path
+
+    return construct_path, _revision_strings(revisions), workdir
+
+
+def run_construct_path(state) -> int:
+    construct_path, wiki_revisions, workdir = state
+    for wiki_revision in wiki_revisions:
+        construct_path(page_name="Synthetic_Article", save_dir=workdir, wiki_revision=wiki_revision)
+    return len(wiki_revisions)
+
+
+# --- converter ---------------------------------------------------------------
+
+
+def setup_parse_revision_xml(revisions: int, workdir: Path):
+    from data_scraper.xml_to_dataframe import parse_revision_xml
+
+    return parse_revision_xml, _revision_strings(revisions)
+
+
+def run_parse_revision_xml(state) -> int:
+    parse_revision_xml, wiki_revisions = state
+    for wiki_revision in wiki_revisions:
+        parse_revision_xml(wiki_revision, include_text=True)
+    return len(wiki_revisions)
+
+
+# --- network -----------------------------------------------------------------
+
+
+def setup_network_parse_revision(revisions: int, workdir: Path):
+    from utils.network import parse_revision
+
+    # stored revisions carry no namespace, unlike the full export
+    body = "".join(_revision_strings(revisions))
+    return parse_revision, f"<mediawiki>{body}</mediawiki>".encode("utf-8")
+
+
+def run_network_parse_revision(state) -> int:
+    from lxml import etree
+
+    parse_revision, xml_bytes = state
+    count = 0
+    for _, elem in etree.iterparse(io.BytesIO(xml_bytes), tag="revision", events=("end",)):
+        count += len(parse_revision(elem, "Synthetic_Article"))
+        elem.clear()
+    return count
+
+
+# --- analysis ----------------------------------------------------------------
+
+
+def setup_find_text_differences(revisions: int, workdir: Path):
+    from utils.utils import find_text_differences
+
+    # difflib is quadratic in the worst case, so diff a twentieth of the pairs
+    texts = [revision["text"] for revision in iter_revisions(_spec(max(2, revisions // 20)))]
+    return find_text_differences, list(zip(texts, texts[1:]))
+
+
+def run_find_text_differences(state) -> int:
+    find_text_differences, pairs = state
+    for before, after in pairs:
+        find_text_differences(before, after)
+    return len(pairs)
+
+
+def _revision_frame(revisions: int):
+    import pandas as pd
+
+    rows = [
+        {
+            "revision_id": str(revision["rev_id"]),
+            "timestamp": revision["timestamp"],
+            "username": revision["username"],
+            "userid": str(revision["user_id"]),
+            "comment": revision["comment"],
+            "text_length": len(revision["text"]),
+            "text": revision["text"],
+            "sha1": revision["sha1"],
+            "bytes": len(revision["text"].encode("utf-8")),
+        }
+        for revision in iter_revisions(_spec(revisions))
+    ]
+    df = pd.DataFrame(rows)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def setup_read_feather_data(revisions: int, workdir: Path):
+    from utils.utils import read_feather_data
+
+    path = Path(workdir) / f"revisions_{revisions}.feather"
+    _revision_frame(revisions).to_feather(path)
+    return read_feather_data, path
+
+
+def run_read_feather_data(state) -> int:
+    read_feather_data, path = state
+    return len(read_feather_data(file_path=path))
+
+
+def setup_resample_counts(revisions: int, workdir: Path):
+    import numpy as np
+    import pandas as pd
+    from utils.plot_graphs import resample_counts
+
+    # hourly-resolution edit log: fifty edits per generated revision
+    rng = np.random.default_rng(42)
+    n = revisions * 50
+    start = pd.Timestamp("2004-01-01", tz="UTC").value
+    offsets = np.sort(rng.integers(0, 20 * 365 * 24 * 3600, size=n)) * 10**9
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(start + offsets, utc=True),
+        "revision_id": np.arange(n),
+    })
+    return resample_counts, df
+
+
+def run_resample_counts(state) -> int:
+    resample_counts, df = state
+    resample_counts(df, "timestamp")
+    return len(df)
+
+
+def setup_flag_reverts(revisions: int, workdir: Path):
+    from utils.reverts import COLUMNS, flag_reverts
+
+    return flag_reverts, _revision_frame(revisions)[COLUMNS]
+
+
+def run_flag_reverts(state) -> int:
+    flag_reverts, df = state
+    return len(flag_reverts(df))
+
+
+def setup_term_counts(revisions: int, workdir: Path):
+    from utils.terms import term_counts
+
+    rows = [(r["timestamp"][:7], r["sha1"], r["text"]) for r in iter_revisions(_spec(revisions))]
+    return term_counts, rows
+
+
+def run_term_counts(state) -> int:
+    term_counts, rows = state
+    term_counts(iter(rows))
+    return len(rows)
+
+
+def setup_edits_per_window(revisions: int, workdir: Path):
+    from utils.query import Corpus
+
+    # ten articles, so the query has to union and aggregate several tables
+    tables = Path(workdir) / "DataFrames"
+    tables.mkdir()
+    df = _revision_frame(revisions)
+    for i in range(10):
+        df.to_feather(tables / f"Article_{i}.feather")
+    return Corpus(workdir, threads=1), 10 * len(df)
+
+
+def run_edits_per_window(state) -> int:
+    corpus, items = state
+    corpus.edits_per_window("week")
+    return items
+
+
+CASES = [
+    Case("parse_mediawiki_revisions", setup_parse_mediawiki_revisions, run_parse_mediawiki_revisions),
+    Case("construct_path", setup_construct_path, run_construct_path),
+    Case("parse_revision_xml", setup_parse_revision_xml, run_parse_revision_xml),
+    Case("network_parse_revision", setup_network_parse_revision, run_network_parse_revision, unit="links"),
+    Case("find_text_differences", setup_find_text_differences, run_find_text_differences, unit="pairs"),
+    Case("read_feather_data", setup_read_feather_data, run_read_feather_data),
+    Case("resample_counts", setup_resample_counts, run_resample_counts, unit="rows"),
+    Case("flag_reverts", setup_flag_reverts, run_flag_reverts),
+    Case("term_counts", setup_term_counts, run_term_counts),
+    Case("edits_per_window", setup_edits_per_window, run_edits_per_window),
+]
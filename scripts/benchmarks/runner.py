@@ -0,0 +1,243 @@
+"""
+Offline benchmark runner.
+
+    python -m benchmarks run --scales small medium --output results.json
+    python -m benchmarks compare main            # main vs. the working tree
+    python -m benchmarks compare v1 v2           # two commits
+    python -m benchmarks compare old.json new.json
+    python -m benchmarks startup --max-seconds 0.5
+
+``run`` times every case at every scale and records throughput and the peak
+Python heap (tracemalloc) of one extra run. ``compare`` accepts saved result
+files or git revisions; revisions are checked out into temporary worktrees and
+benchmarked with the current cases, so old commits need no benchmark code;
+cases whose code a revision does not have yet are reported as not available
+there instead of failed.
+``startup`` times the ``wikianalysis`` subcommands in fresh interpreters.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+REPO_ROOT = SCRIPTS_DIR.parent
+
+
+def _git(*args, cwd=REPO_ROOT) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def _commit(source: Path) -> str:
+    try:
+        return _git("rev-parse", "--short", "HEAD", cwd=source)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "unknown"
+
+
+def time_case(case, scale: str, revisions: int, repeat: int, workdir: Path) -> dict:
+    state = case.setup(revisions, workdir)
+    items = case.run(state)  # warm up caches and imports
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.run(state)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    case.run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "case": case.name,
+        "scale": scale,
+        "items": items,
+        "unit": case.unit,
+        "min_s": best,
+        "median_s": statistics.median(timings),
+        "throughput": items / best if best else None,
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def run(scales: list, cases: list = None, repeat: int = 3, source: Path = None) -> dict:
+    """Run the selected cases at the selected scales and return the results."""
+    source = Path(source or SCRIPTS_DIR)
+    sys.path.insert(0, str(source))
+    from .cases import CASES, SCALES
+
+    selected = [case for case in CASES if not cases or case.name in cases]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for case in selected:
+            for scale in scales:
+                workdir = Path(tmp) / case.name / scale
+                workdir.mkdir(parents=True)
+                print(f"{case.name} [{scale}]...", end=" ", flush=True)
+                try:
+                    result = time_case(case, scale, SCALES[scale], repeat, workdir)
+                    print(f"{result['throughput']:.0f} {case.unit}/s, peak {result['peak_mb']:.1f} MB")
+                except ImportError as e:
+                    # the checkout under test predates the code (or lacks an optional dependency)
+                    result = {"case": case.name, "scale": scale, "unavailable": str(e)}
+                    print(f"not available: {e}")
+                except Exception as e:
+                    result = {"case": case.name, "scale": scale, "error": repr(e)}
+                    print(f"failed: {e!r}")
+                results.append(result)
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(source),
+            "source": str(source),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _results_for(target: str, scales: list, cases: list, repeat: int) -> dict:
+    """Load a results file, or benchmark a git revision in a temporary worktree."""
+    if target.endswith(".json") and Path(target).exists():
+        return json.loads(Path(target).read_text(encoding="utf-8"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "results.json"
+        command = [sys.executable, "-m", "benchmarks", "run", "--output", str(output), "--repeat", str(repeat)]
+        command += ["--scales", *scales]
+        if cases:
+            command += ["--cases", *cases]
+        if target == "WORKTREE":
+            subprocess.run(command, cwd=SCRIPTS_DIR, check=True)
+            return json.loads(output.read_text(encoding="utf-8"))
+
+        worktree = Path(tmp) / "worktree"
+        _git("worktree", "add", "--detach", str(worktree), target)
+        try:
+            command += ["--source", str(worktree / "scripts")]
+            subprocess.run(command, cwd=SCRIPTS_DIR, check=True)
+            return json.loads(output.read_text(encoding="utf-8"))
+        finally:
+            _git("worktree", "remove", "--force", str(worktree))
+
+
+def _change(base, head) -> str:
+    if not base or head is None:
+        return "n/a"
+    return f"{(head - base) / base * 100:+.1f}%"
+
+
+def _note(result: dict, side: str) -> str:
+    if result is None:
+        return f"not run on {side}"
+    if "unavailable" in result:
+        return f"not available on {side} ({result['unavailable']})"
+    if "error" in result:
+        return f"failed on {side}: {result['error']}"
+    return ""
+
+
+def compare(base: dict, head: dict) -> list:
+    """Pair up results by case and scale and compute relative changes."""
+    head_results = {(r["case"], r["scale"]): r for r in head["results"]}
+    rows = []
+    for b in base["results"]:
+        h = head_results.get((b["case"], b["scale"]))
+        note = _note(b, "base") or _note(h, "head")
+        if note:
+            rows.append({"case": b["case"], "scale": b["scale"], "note": note})
+            continue
+        rows.append({
+            "case": b["case"],
+            "scale": b["scale"],
+            "unit": b["unit"],
+            "base_throughput": b["throughput"],
+            "head_throughput": h["throughput"],
+            "throughput_change": _change(b["throughput"], h["throughput"]),
+            "base_peak_mb": b["peak_mb"],
+            "head_peak_mb": h["peak_mb"],
+            "memory_change": _change(b["peak_mb"], h["peak_mb"]),
+        })
+    return rows
+
+
+def format_comparison(rows: list, base_name: str, head_name: str) -> str:
+    output = [f"Comparing {base_name} (base) with {head_name} (head)", ""]
+    header = f"{'case':<28}{'scale':<8}{'base/s':>12}{'head/s':>12}{'change':>10}{'base MB':>10}{'head MB':>10}{'change':>10}"
+    output.append(header)
+    output.append("-" * len(header))
+    for row in rows:
+        if "note" in row:
+            output.append(f"{row['case']:<28}{row['scale']:<8}  {row['note']}")
+            continue
+        output.append(
+            f"{row['case']:<28}{row['scale']:<8}"
+            f"{row['base_throughput']:>12.0f}{row['head_throughput']:>12.0f}{row['throughput_change']:>10}"
+            f"{row['base_peak_mb']:>10.1f}{row['head_peak_mb']:>10.1f}{row['memory_change']:>10}"
+        )
+    return "\n".join(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Offline benchmarks on synthetic Special:Export data",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub):
+        sub.add_argument("--scales", nargs="+", default=["small", "medium"], help="small, medium and/or large")
+        sub.add_argument("--cases", nargs="+", default=None, help="Only run these cases (default: all)")
+        sub.add_argument("--repeat", type=int, default=3, help="Timed runs per case")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks once")
+    add_common(run_parser)
+    run_parser.add_argument("--output", type=Path, default=None, help="Save the results as JSON")
+    run_parser.add_argument("--source", type=Path, default=None, help="scripts/ folder of the code under test")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two commits or result files")
+    add_common(compare_parser)
+    compare_parser.add_argument("base", help="Git revision or results .json")
+    compare_parser.add_argument("head", nargs="?", default="WORKTREE", help="Git revision or results .json")
+    compare_parser.add_argument("--output", type=Path, default=None, help="Save the comparison as JSON")
+
+    startup_parser = subparsers.add_parser("startup", help="Time the start-up of the wikianalysis command")
+    startup_parser.add_argument("--commands", nargs="+", default=None, help="Only time these commands (e.g. count help)")
+    startup_parser.add_argument("--repeat", type=int, default=5, help="Runs per command")
+    startup_parser.add_argument("--max-seconds", type=float, default=None, help="Exit with status 1 if a median exceeds this")
+    startup_parser.add_argument("--output", type=Path, default=None, help="Save the timings as JSON")
+
+    args = parser.parse_args(argv)
+    if args.command == "startup":
+        from . import startup
+
+        sys.exit(startup.main(args))
+    if args.command == "run":
+        results = run(args.scales, args.cases, args.repeat, args.source)
+        if args.output:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+            print(f"Results saved to {args.output}")
+        return
+
+    base = _results_for(args.base, args.scales, args.cases, args.repeat)
+    head = _results_for(args.head, args.scales, args.cases, args.repeat)
+    rows = compare(base, head)
+    print(format_comparison(rows, args.base, args.head))
+    if args.output:
+        args.output.write_text(json.dumps({"base": base["meta"], "head": head["meta"], "rows": rows}, indent=2), encoding="utf-8")
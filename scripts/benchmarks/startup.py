@@ -0,0 +1,114 @@
+"""
+Start-up benchmark for the ``wikianalysis`` command line.
+
+Each command is run in a fresh interpreter several times; the report shows the
+best and median wall time and which heavy libraries the command imported.
+``--max-seconds`` turns it into a check for cron and health-check commands:
+
+    python -m benchmarks startup
+    python -m benchmarks startup --max-seconds 0.5 --commands count
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "bs4", "lxml", "requests", "plotly", "wordcloud", "PIL", "tqdm")
+
+# name -> arguments to ``wikianalysis``; {data_dir} is an empty temporary folder
+COMMANDS = {
+    "help": ["--help"],
+    "count": ["count", "Startup_Check", "--data-dir", "{data_dir}"],
+    "download --help": ["download", "--help"],
+    "convert --help": ["convert", "--help"],
+    "links --help": ["links", "--help"],
+    "plot --help": ["plot", "--help"],
+    "events --help": ["events", "--help"],
+    "reverts --help": ["reverts", "--help"],
+    "report --help": ["report", "--help"],
+    "terms --help": ["terms", "--help"],
+    "wordcloud --help": ["wordcloud", "--help"],
+    "query --help": ["query", "--help"],
+}
+
+# runs the CLI in-process, then reports which heavy modules ended up loaded
+PROBE = """
+import io, json, sys, contextlib
+sys.path.insert(0, {scripts!r})
+import wikianalysis
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        wikianalysis.main({argv!r})
+    except SystemExit:
+        pass
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+
+def _time(command: list, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _heavy_imports(argv: list) -> list:
+    code = PROBE.format(scripts=str(SCRIPTS_DIR), argv=argv, heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    return json.loads(lines[-1]) if lines else ["<probe failed>"]
+
+
+def run(commands: list = None, repeat: int = 5) -> list:
+    """Time each command; the first row is a bare interpreter for reference."""
+    timings = _time([sys.executable, "-c", "pass"], repeat)
+    results = [{
+        "command": "python -c pass",
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "heavy_imports": [],
+    }]
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name, argv in COMMANDS.items():
+            if commands and name not in commands:
+                continue
+            argv = [arg.format(data_dir=data_dir) for arg in argv]
+            timings = _time([sys.executable, str(SCRIPTS_DIR / "wikianalysis.py"), *argv], repeat)
+            results.append({
+                "command": f"wikianalysis {name}",
+                "min_s": min(timings),
+                "median_s": statistics.median(timings),
+                "heavy_imports": _heavy_imports(argv),
+            })
+    return results
+
+
+def format_results(results: list) -> str:
+    output = [f"{'command':<32}{'min s':>8}{'median s':>10}  heavy imports"]
+    for result in results:
+        output.append(
+            f"{result['command']:<32}{result['min_s']:>8.3f}{result['median_s']:>10.3f}  "
+            f"{', '.join(result['heavy_imports']) or '-'}"
+        )
+    return "\n".join(output)
+
+
+def main(args) -> int:
+    results = run(args.commands, args.repeat)
+    print(format_results(results))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.max_seconds is not None:
+        slow = [r for r in results[1:] if r["median_s"] > args.max_seconds]
+        for result in slow:
+            print(f"{result['command']} took {result['median_s']:.3f}s (limit {args.max_seconds}s)")
+        return 1 if slow else 0
+    return 0
@@ -0,0 +1,249 @@
+"""
+Deterministic generator for synthetic Special:Export XML.
+
+The output mimics the shape of the real Wikipedia exports used by the scraper:
+one <page> with many <revision> elements carrying id, parentid, timestamp,
+contributor, comment, sha1 and wikitext containing internal links and cite
+templates. The same parameters and seed always give the same XML, so the
+benchmarks can run offline and be compared across commits.
+"""
+
+import hashlib
+import random
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "album singer songwriter tour record label country pop music award "
+    "billboard grammy single release chart studio producer concert fans "
+    "television interview rapper fashion controversy remarks performance "
+    "career early life family education personal philanthropy legacy "
+    "discography filmography reception critics sales certification history"
+).split()
+
+LINK_TARGETS = (
+    "Taylor Swift", "Kanye West", "Big Machine Records", "Republic Records",
+    "MTV Video Music Awards", "Grammy Award", "Billboard Hot 100", "Nashville",
+    "Country music", "Pop music", "Hip hop music", "Def Jam Recordings",
+    "Chicago", "New York City", "Los Angeles", "Kim Kardashian", "Beyonce",
+    "Jay-Z", "The Eras Tour", "Fearless (album)", "Graduation (album)",
+)
+
+CITE_TYPES = ("web", "news", "magazine", "book", "journal")
+
+HEADER = (
+    '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/" '
+    'version="0.11" xml:lang="en">\n'
+    "  <page>\n"
+    "    <title>{title}</title>\n"
+    "    <ns>0</ns>\n"
+    "    <id>{page_id}</id>\n"
+)
+FOOTER = "  </page>\n</mediawiki>\n"
+
+REVISION = """    <revision>
+      <id>{rev_id}</id>
+      <parentid>{parent_id}</parentid>
+      <timestamp>{timestamp}</timestamp>
+      <contributor>
+        <username>{username}</username>
+        <id>{user_id}</id>
+      </contributor>
+      <comment>{comment}</comment>
+      <model>wikitext</model>
+      <format>text/x-wiki</format>
+      <text bytes="{bytes}" xml:space="preserve">{text}</text>
+      <sha1>{sha1}</sha1>
+    </revision>
+"""
+
+
+@dataclass
+class ExportSpec:
+    """Knobs for the generated export. Sizes are in characters of wikitext."""
+
+    title: str = "Synthetic_Article"
+    revisions: int = 1000
+    article_size: int = 20_000
+    link_density: float = 8.0  # internal links per 1000 characters
+    cite_density: float = 2.0  # cite templates per 1000 characters
+    revert_rate: float = 0.05  # share of revisions restoring an earlier text
+    editors: int = 200
+    editor_skew: float = 1.2  # Zipf exponent of edits per editor
+    edit_size: int = 200  # characters changed by a regular edit
+    start: datetime = datetime(2004, 1, 1)
+    mean_gap_hours: float = 24.0
+    seed: int = 0
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _zipf_weights(n: int, skew: float) -> list:
+    return [1.0 / (rank**skew) for rank in range(1, n + 1)]
+
+
+def _paragraph(rng: random.Random, size: int, spec: ExportSpec) -> str:
+    """Random wikitext of roughly ``size`` characters with links and cites."""
+    parts = []
+    length = 0
+    link_p = spec.link_density / 1000 * 7  # ~7 characters per word
+    cite_p = spec.cite_density / 1000 * 7
+    while length < size:
+        roll = rng.random()
+        if roll < link_p:
+            target = rng.choice(LINK_TARGETS)
+            if rng.random() < 0.3:
+                token = f"[[{target}|{rng.choice(WORDS)}]]"
+            else:
+                token = f"[[{target}]]"
+        elif roll < link_p + cite_p:
+            slug = rng.randrange(10**6)
+            token = (
+                f"<ref>{{{{cite {rng.choice(CITE_TYPES)} "
+                f"|url=https://example.com/{slug} |title={rng.choice(WORDS).title()} "
+                f"{rng.choice(WORDS)} |access-date=2020-01-01}}}}</ref>"
+            )
+        else:
+            token = rng.choice(WORDS)
+        parts.append(token)
+        length += len(token) + 1
+    return " ".join(parts)
+
+
+def _edit(rng: random.Random, text: str, spec: ExportSpec) -> str:
+    """Insert, delete or replace a chunk of ``text`` around a random offset."""
+    chunk = rng.randint(spec.edit_size // 2, spec.edit_size * 2)
+    pos = rng.randrange(len(text) + 1)
+    roll = rng.random()
+    # grow towards article_size, then hover around it
+    if len(text) < spec.article_size or roll < 0.3:
+        return text[:pos] + " " + _paragraph(rng, chunk, spec) + " " + text[pos:]
+    if roll < 0.7:
+        return text[:pos] + text[pos + chunk :]
+    return text[:pos] + " " + _paragraph(rng, chunk, spec) + " " + text[pos + chunk :]
+
+
+def iter_revisions(spec: ExportSpec):
+    """
+    Yield revision dicts oldest first. Reverts restore one of the last few
+    texts exactly, so they share its sha1 like real identity reverts; never
+    the current text, which would make the revert a null edit.
+    """
+    rng = random.Random(spec.seed)
+    weights = _zipf_weights(spec.editors, spec.editor_skew)
+    editor_ids = list(range(1, spec.editors + 1))
+    history = deque(maxlen=5)
+    text = _paragraph(rng, spec.article_size // 4, spec)
+    timestamp = spec.start
+    rev_id = 1000
+    parent_id = 0
+    for i in range(spec.revisions):
+        # history ends with the current text (and may hold earlier copies of it)
+        earlier = [old for old in history if old != text]
+        if earlier and rng.random() < spec.revert_rate:
+            text = rng.choice(earlier)
+            comment = "Reverted edits"
+        elif i > 0:
+            text = _edit(rng, text, spec)
+            comment = f"edit {rng.choice(WORDS)}"
+        else:
+            comment = "Created page"
+        history.append(text)
+        user_id = rng.choices(editor_ids, weights=weights)[0]
+        rev_id += rng.randint(1, 50)
+        timestamp += timedelta(hours=rng.expovariate(1.0 / spec.mean_gap_hours))
+        yield {
+            "rev_id": rev_id,
+            "parent_id": parent_id,
+            "timestamp": timestamp.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "username": f"Editor{user_id}",
+            "user_id": user_id,
+            "comment": comment,
+            "text": text,
+            "sha1": _sha1(text),
+        }
+        parent_id = rev_id
+
+
+def render_revision(revision: dict) -> str:
+    text = revision["text"]
+    return REVISION.format(
+        rev_id=revision["rev_id"],
+        parent_id=revision["parent_id"],
+        timestamp=revision["timestamp"],
+        username=escape(revision["username"]),
+        user_id=revision["user_id"],
+        comment=escape(revision["comment"]),
+        bytes=len(text.encode("utf-8")),
+        text=escape(text),
+        sha1=revision["sha1"],
+    )
+
+
+def generate_export(spec: ExportSpec = None, **overrides) -> str:
+    """Return a full Special:Export document for ``spec`` (newest revision first)."""
+    spec = spec or ExportSpec(**overrides)
+    revisions = [render_revision(revision) for revision in iter_revisions(spec)]
+    header = HEADER.format(title=escape(spec.title), page_id=spec.seed + 1)
+    return header + "".join(reversed(revisions)) + FOOTER
+
+
+def write_revision_store(spec: ExportSpec, data_dir: Path) -> Path:
+    """
+    Write the revisions into the scraper's on-disk layout,
+    <data_dir>/<title>/<year>/<month>/<day>/<revision_id>.xml
+    """
+    data_dir = Path(data_dir)
+    for revision in iter_revisions(spec):
+        year, month, day = revision["timestamp"][:10].split("-")
+        path = data_dir / spec.title / year / month / day / f"{revision['rev_id']}.xml"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render_revision(revision).strip() + "\n", encoding="utf-8")
+    return data_dir / spec.title
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic Special:Export XML file",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("output", type=Path, help="XML file, or data directory with --store")
+    parser.add_argument("--title", default=ExportSpec.title)
+    parser.add_argument("--revisions", type=int, default=ExportSpec.revisions)
+    parser.add_argument("--article-size", type=int, default=ExportSpec.article_size)
+    parser.add_argument("--link-density", type=float, default=ExportSpec.link_density)
+    parser.add_argument("--cite-density", type=float, default=ExportSpec.cite_density)
+    parser.add_argument("--revert-rate", type=float, default=ExportSpec.revert_rate)
+    parser.add_argument("--editors", type=int, default=ExportSpec.editors)
+    parser.add_argument("--editor-skew", type=float, default=ExportSpec.editor_skew)
+    parser.add_argument("--seed", type=int, default=ExportSpec.seed)
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help="Write one file per revision in the scraper's directory layout",
+    )
+    args = parser.parse_args()
+    spec = ExportSpec(
+        title=args.title,
+        revisions=args.revisions,
+        article_size=args.article_size,
+        link_density=args.link_density,
+        cite_density=args.cite_density,
+        revert_rate=args.revert_rate,
+        editors=args.editors,
+        editor_skew=args.editor_skew,
+        seed=args.seed,
+    )
+    if args.store:
+        print(f"Wrote revisions to {write_revision_store(spec, args.output)}")
+    else:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(generate_export(spec), encoding="utf-8")
+        print(f"Wrote {spec.revisions} revisions to {args.output}")
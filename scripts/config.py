@@ -1,11 +1,10 @@
 import os
-import sys
 
+# Paths only: importing this module has no side effects. Set WIKI_DATA_DIR or
+# WIKI_OUTPUT_DIR to keep the data or figures somewhere else. PROJECT_ROOT is
+# the checkout this file lives in, hence editable installs only (pip install -e .).
 CURR_DIR = os.path.dirname(os.path.abspath(__file__)).replace("\\", "/")
 PROJECT_ROOT = os.path.dirname(CURR_DIR).replace("\\", "/")
-sys.path.append(PROJECT_ROOT)
 
-DATA_DIR = os.path.join(PROJECT_ROOT, "data").replace("\\", "/")
-OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output").replace("\\", "/")
-
-print(CURR_DIR)
+DATA_DIR = os.environ.get("WIKI_DATA_DIR", os.path.join(PROJECT_ROOT, "data")).replace("\\", "/")
+OUTPUT_DIR = os.environ.get("WIKI_OUTPUT_DIR", os.path.join(PROJECT_ROOT, "output")).replace("\\", "/")
@@ -1,43 +1,74 @@
+import argparse
 import sys
 import os
+from pathlib import Path
 
-# Add the parent directory to sys.path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Put the scripts directory first so the data_scraper package wins over this file
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import *
+from data_scraper.pipeline import STAGES, PipelineOptions, format_log, run_pipeline
 import pandas as pd
 
-# Define articles we want to download
-article1 = "Taylor_Swift"
-article2 = "Kanye_West"
 
-# Create necessary directories if they don't exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(os.path.join(DATA_DIR, "DataFrames"), exist_ok=True)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Download, store and convert the articles, then show the first one's DataFrame",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("articles", nargs="*", default=["Taylor_Swift", "Kanye_West"], help="Titles of the Wikipedia pages")
+    parser.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory for revisions, tables and caches")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=["fetch", "store", "table"], help="Stages to bring up to date")
+    parser.add_argument("--text", action=argparse.BooleanOptionalAction, default=True, help="Include full text content in the revision tables")
+    parser.add_argument("--refresh", action="store_true", help="Download the revisions made since the last fetch")
+    parser.add_argument("--force", action="store_true", help="Rebuild every artifact even if it is up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which artifacts would be rebuilt")
+    parser.add_argument("--workers", type=int, default=2, help="Articles processed in parallel")
+    return parser.parse_args(argv)
 
-# Download revisions for both articles    # uncomment this to rerun scraper
-print("Downloading revisions for first article...")
-os.system(f'python scripts/data_scraper/download_wiki_revisions.py "{article1}"')
-print("\nDownloading revisions for second article...")
-os.system(f'python scripts/data_scraper/download_wiki_revisions.py "{article2}"')
 
-# Convert all downloaded revisions to DataFrames
-print("\nConverting revisions to DataFrames...")
-os.system(f"python scripts/data_scraper/xml_to_dataframe.py --include-text")
+def main(argv=None):
+    args = parse_args(argv)
 
-# Load and verify one of the DataFrames
-print("\nVerifying DataFrame contents...")
-df = pd.read_feather(f"{DATA_DIR}/DataFrames/{article1}.feather")
+    # Download, store and convert the articles. Only stale artifacts are rebuilt;
+    # --refresh downloads the revisions made since the last run
+    print("Updating revisions and DataFrames...")
+    options = PipelineOptions(
+        data_dir=args.data_dir,
+        stages=tuple(args.stages),
+        include_text=args.text,
+        refresh=args.refresh,
+        force=args.force,
+        dry_run=args.dry_run,
+        workers=args.workers,
+    )
+    log = run_pipeline(args.articles, options)
+    print(format_log(log, dry_run=args.dry_run))
+    if args.dry_run:
+        return
 
-# Display basic information about the DataFrame
-print("\nDataFrame Info:")
-print(df.info())
+    # Load and verify one of the DataFrames
+    path = args.data_dir / "DataFrames" / f"{args.articles[0]}.feather"
+    if not path.exists():
+        return
+    print("\nVerifying DataFrame contents...")
+    df = pd.read_feather(path)
 
-print("\nFirst few rows:")
-print(df.head())
+    # Display basic information about the DataFrame
+    print("\nDataFrame Info:")
+    print(df.info())
 
-# Display some basic statistics
-print("\nBasic statistics:")
-print(f"Total number of revisions: {len(df)}")
-print(f"Date range: from {df['timestamp'].min()} to {df['timestamp'].max()}")
-print(f"Number of unique editors: {df['username'].nunique()}")
+    print("\nFirst few rows:")
+    print(df.head())
+
+    # Display some basic statistics
+    print("\nBasic statistics:")
+    print(f"Total number of revisions: {len(df)}")
+    print(f"Date range: from {df['timestamp'].min()} to {df['timestamp'].max()}")
+    print(f"Number of unique editors: {df['username'].nunique()}")
+
+
+# the pipeline runs the articles in worker processes; where they are started
+# with spawn (Windows, macOS) each worker imports this file again
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,29 @@
 import argparse
+import os
+import re
+import sys
 from datetime import datetime
 from pathlib import Path
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
-import requests
-from bs4 import BeautifulSoup
-from tqdm import tqdm
+
+# requests, bs4 and tqdm are imported inside the functions that use them so
+# that counting stored revisions starts without loading them
+
+if __name__ == "__main__":
+    # run as a script: put scripts/ first so config, utils and the data_scraper
+    # package (rather than data_scraper.py next to this file) can be imported
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import profiling
 
 DATA_DIR = Path("data")
+EXPORT_URL = "https://en.wikipedia.org/w/index.php"
+TIMESTAMP_PATTERN = re.compile(r"<timestamp>([^<]+)</timestamp>")
 
 
-def download_page_w_revisions(page_title: str) -> str:
-    """Downloads complete revision history of a page using Special:Export with progress bar."""
-    url = f"https://en.wikipedia.org/wiki/Special:Export/{page_title}"
-    params = {"history": "", "action": "submit"}  # Empty parameter to get full history
+def _session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 
     # Create a session with retry logic
     session = requests.Session()
@@ -23,6 +33,16 @@ def download_page_w_revisions(page_title: str) -> str:
         raise_on_status=False,
     )
     session.mount("https://", HTTPAdapter(max_retries=retries))
+    return session
+
+
+def download_page_w_revisions(page_title: str) -> str:
+    """Downloads complete revision history of a page using Special:Export with progress bar."""
+    from tqdm import tqdm
+
+    url = f"https://en.wikipedia.org/wiki/Special:Export/{page_title}"
+    params = {"history": "", "action": "submit"}  # Empty parameter to get full history
+    session = _session()
 
     try:
         # Make initial request to get content length
@@ -46,6 +66,7 @@ def download_page_w_revisions(page_title: str) -> str:
         for data in response.iter_content(chunk_size=8192):
             content.append(data)
             progress.update(len(data))
+            profiling.add("bytes_downloaded", len(data))
 
         return b"".join(content).decode("utf-8")
     except Exception as e:
@@ -55,7 +76,43 @@ def download_page_w_revisions(page_title: str) -> str:
         progress.close()
 
 
+def _export_after(session, page_title: str, offset: str, limit: int) -> str:
+    params = {
+        "title": "Special:Export",
+        "pages": page_title,
+        "offset": offset,  # exclusive
+        "limit": limit,
+        "dir": "asc",
+        "action": "submit",
+    }
+    response = session.post(EXPORT_URL, data=params)
+    response.raise_for_status()
+    profiling.add("bytes_downloaded", len(response.content))
+    return response.text
+
+
+def download_revisions_after(page_title: str, offset: str, limit: int = 1000):
+    """
+    Yield (export XML, revisions, last timestamp) for the revisions of a page
+    made after the timestamp ``offset`` (e.g. "2024-05-01T12:00:00Z"), oldest
+    first and at most ``limit`` per request (MediaWiki caps it at 1000).
+    """
+    limit = min(limit, 1000)
+    session = _session()
+    while True:
+        xml_content = _export_after(session, page_title, offset, limit)
+        timestamps = TIMESTAMP_PATTERN.findall(xml_content)
+        if not timestamps:
+            return
+        yield xml_content, len(timestamps), timestamps[-1]
+        if len(timestamps) < limit or timestamps[-1] <= offset:
+            return
+        offset = timestamps[-1]
+
+
 def parse_mediawiki_revisions(xml_content):
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(xml_content, "lxml-xml")
     for revision in soup.find_all("revision"):
         yield str(revision)
@@ -63,6 +120,8 @@ def parse_mediawiki_revisions(xml_content):
 
 def count_revisions_in_xml(xml_content: str) -> int:
     """Count the number of revisions in a single XML response."""
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(xml_content, "lxml-xml")
     return len(soup.find_all("revision"))
 
@@ -146,29 +205,42 @@ def main(page: str, data_dir: Path, count_only: bool = False):
     If count_only is True, just prints the count of stored revisions.
     """
     if count_only:
-        counts = count_stored_revisions(page, data_dir)
+        with profiling.stage("count", page=page):
+            counts = count_stored_revisions(page, data_dir)
+            profiling.add("revisions", counts["total"])
         print(format_revision_counts(page, counts))
         return
 
-    print(f"Downloading complete history of {page}")
-    raw_revisions = download_page_w_revisions(page)
-
-    # Count total revisions for progress bar
-    total_revisions = len(BeautifulSoup(raw_revisions, "lxml-xml").find_all("revision"))
-    print(f"Found {total_revisions} revisions. Organizing into directory structure...")
+    from bs4 import BeautifulSoup
+    from tqdm import tqdm
 
-    for wiki_revision in tqdm(
-        parse_mediawiki_revisions(raw_revisions), total=total_revisions
-    ):
-        revision_path = construct_path(
-            wiki_revision=wiki_revision, page_name=page, save_dir=data_dir
-        )
-        if not revision_path.exists():
-            revision_path.parent.mkdir(parents=True, exist_ok=True)
-            revision_path.write_text(wiki_revision, encoding="utf-8")
+    print(f"Downloading complete history of {page}")
+    with profiling.stage("download", page=page):
+        raw_revisions = download_page_w_revisions(page)
+
+    with profiling.stage("store", page=page) as stage:
+        # Count total revisions for progress bar
+        total_revisions = len(BeautifulSoup(raw_revisions, "lxml-xml").find_all("revision"))
+        print(f"Found {total_revisions} revisions. Organizing into directory structure...")
+
+        for wiki_revision in tqdm(
+            parse_mediawiki_revisions(raw_revisions), total=total_revisions
+        ):
+            revision_path = construct_path(
+                wiki_revision=wiki_revision, page_name=page, save_dir=data_dir
+            )
+            stage.add("revisions")
+            if not revision_path.exists():
+                revision_path.parent.mkdir(parents=True, exist_ok=True)
+                revision_path.write_text(wiki_revision, encoding="utf-8")
+                if profiling.is_enabled():
+                    stage.add("files_written")
+                    stage.add("bytes_written", len(wiki_revision.encode("utf-8")))
 
     # Show final counts
-    counts = count_stored_revisions(page, data_dir)
+    with profiling.stage("count", page=page):
+        counts = count_stored_revisions(page, data_dir)
+        profiling.add("revisions", counts["total"])
     print("\nFinal revision counts:")
     print(format_revision_counts(page, counts))
 
@@ -182,6 +254,8 @@ def find_timestamp(revision: str) -> datetime:
 
 
 def _extract_attribute(text: str, attribute: str = "timestamp") -> str:
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(text, "lxml-xml")
     result = soup.find(attribute)
     if result is None:
@@ -243,5 +317,12 @@ if __name__ == "__main__":
         default=DATA_DIR,
         help="Directory to store the revision data",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write a timing/memory report to output/profiling (or $WIKI_PROFILE_DIR)",
+    )
     args = parser.parse_args()
+    if args.profile:
+        profiling.enable()
     main(page=args.page, data_dir=args.data_dir, count_only=args.count_only)
@@ -0,0 +1,706 @@
+"""
+Cached, dependency-aware pipeline for one or more Wikipedia articles.
+
+Stages, in order:
+    fetch    full Special:Export history         data/exports/<article>.xml
+             then only newer revisions           data/exports/<article>/<last timestamp>.xml
+    store    one file per revision               data/<article>/<yyyy>/<mm>/<dd>/<id>.xml
+    table    revision metadata                   data/cache/<article>/table/<yyyy-mm>.feather
+                                                 -> data/DataFrames/<article>.feather
+    links    internal links and citations        data/cache/<article>/links/<yyyy-mm>.feather
+    terms    term counts of the text and edits   data/cache/<article>/terms/<yyyy-mm>.feather
+                                                 -> data/terms/<article>.feather
+    edges    Gephi node/edge tables              data/network/node.csv, edge.csv, nodeEdge.csv
+    rollups  cutoff-date edge aggregates         data/network/TK_*.csv, UniqueEdgesBefore_*.csv, ...
+    figures  revisions over time per article     output/<article>_revisions.html (+ output/plotly-<version>.min.js)
+
+Every artifact is keyed by a hash of its inputs and parameters, recorded in a
+manifest, and rebuilt only when the key changes or the output is missing.
+--refresh downloads only the revisions after the newest one already fetched,
+and every export file is split once (keyed by its name and size). Stored
+revision files never change once written (the file name is the revision id),
+so a month is keyed by the names and sizes of its files (for terms, also the
+last file of the month before): a day of new edits rebuilds that month's
+table and links partitions plus the cheap concatenation, edge, rollup and
+figure steps.
+
+Articles run in parallel with --workers; --dry-run lists what would rebuild.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+if __name__ == "__main__":
+    # run as a script: put scripts/ first so config, utils and the data_scraper
+    # package (rather than data_scraper.py next to this file) can be imported
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_DIR, OUTPUT_DIR
+from utils import profiling
+
+STAGES = ("fetch", "store", "table", "links", "terms", "edges", "rollups", "figures")
+
+# Bump a stage's version after changing its code to invalidate its artifacts
+STAGE_VERSIONS = {"store": 2, "table": 2, "links": 1, "terms": 2, "edges": 1, "rollups": 1, "figures": 3}
+
+LINK_COLUMNS = [
+    "revId", "ParentId", "ArticleName", "TimeStamp", "Year", "Month", "Day",
+    "Link", "LinkTitle", "LinkType",
+]
+
+FRESH, BUILT, STALE, MISSING = "fresh", "built", "would rebuild", "missing input"
+
+
+@dataclass
+class PipelineOptions:
+    data_dir: Path = Path(DATA_DIR)
+    output_dir: Path = Path(OUTPUT_DIR)
+    stages: tuple = STAGES
+    include_text: bool = False
+    refresh: bool = False
+    force: bool = False
+    dry_run: bool = False
+    workers: int = 1
+    edge_cutoff: str = "2012-07-01"
+    newly_connected_after: str = "2006-12-30"
+    edge_window: tuple = ("2009-09-11", 30)
+
+
+@dataclass
+class ArticleResult:
+    article: str
+    log: list = field(default_factory=list)
+    store_changed: bool = False
+    links_changed: bool = False
+    table_key: str = None
+    link_keys: dict = field(default_factory=dict)
+
+
+def hash_key(*parts) -> str:
+    """Stable hash of JSON-serialisable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+class Manifest:
+    """Artifact name -> key of the inputs it was last built from."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def is_fresh(self, name: str, key: str, outputs: list) -> bool:
+        return self.entries.get(name) == key and all(Path(p).exists() for p in outputs)
+
+    def record(self, name: str, key: str) -> None:
+        self.entries[name] = key
+
+    def forget(self, name: str) -> None:
+        self.entries.pop(name, None)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+class ArticlePaths:
+    def __init__(self, article: str, options: PipelineOptions):
+        data_dir = Path(options.data_dir)
+        self.export = data_dir / "exports" / f"{article}.xml"
+        self.updates = data_dir / "exports" / article
+        self.store = data_dir / article
+        self.cache = data_dir / "cache" / article
+        self.table = data_dir / "DataFrames" / f"{article}.feather"
+        self.terms = data_dir / "terms" / f"{article}.feather"
+        self.figure = Path(options.output_dir) / f"{article}_revisions.html"
+
+
+def network_dir(options: PipelineOptions) -> Path:
+    return Path(options.data_dir) / "network"
+
+
+def list_months(store_dir: Path) -> dict:
+    """Map "yyyy-mm" to the sorted revision files stored for that month."""
+    months = {}
+    if not store_dir.exists():
+        return months
+    for month_dir in sorted(store_dir.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]")):
+        files = sorted(month_dir.glob("*/*.xml"))
+        if files:
+            months[f"{month_dir.parent.name}-{month_dir.name}"] = files
+    return months
+
+
+def export_files(paths: ArticlePaths) -> list:
+    """The full export, if any, followed by the update exports, oldest first."""
+    files = [paths.export] if paths.export.exists() else []
+    return files + sorted(paths.updates.glob("*.xml"))
+
+
+def _file_stamp(timestamp: str) -> str:
+    # "2024-05-01T12:00:00Z" -> "20240501T120000Z", a valid file name everywhere
+    return timestamp.replace("-", "").replace(":", "")
+
+
+def last_fetched_timestamp(paths: ArticlePaths) -> str:
+    """Timestamp of the newest revision stored or waiting in an update export."""
+    from datetime import datetime
+    from data_scraper.download_wiki_revisions import TIMESTAMP_PATTERN
+
+    timestamps = [
+        datetime.strptime(f.stem, "%Y%m%dT%H%M%SZ").strftime("%Y-%m-%dT%H:%M:%SZ")
+        for f in paths.updates.glob("*.xml")
+    ]
+    days = sorted(paths.store.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]"))
+    if days:
+        for f in days[-1].glob("*.xml"):
+            match = TIMESTAMP_PATTERN.search(f.read_text(encoding="utf-8"))
+            if match:
+                timestamps.append(match.group(1))
+    return max(timestamps, default=None)
+
+
+def month_fingerprint(files: list) -> list:
+    return [(f"{f.parent.name}/{f.name}", f.stat().st_size) for f in files]
+
+
+def _write_feather(df, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    df.reset_index(drop=True).to_feather(tmp)
+    tmp.replace(path)
+
+
+# --- per-article stages --------------------------------------------------------
+
+
+def fetch(article: str, paths: ArticlePaths, options: PipelineOptions, result: ArticleResult) -> None:
+    # The remote history has no content hash, so fetch only when asked to or
+    # when neither an export nor stored revisions exist yet.
+    full = options.force or not (paths.export.exists() or paths.store.exists())
+    if not (options.refresh or full):
+        result.log.append(("fetch", article, FRESH))
+        return
+    offset = None if full else last_fetched_timestamp(paths)
+    if options.dry_run:
+        result.store_changed = True
+        result.log.append(("fetch", article if offset is None else f"{article} (after {offset})", STALE))
+        return
+    if offset is not None:
+        fetch_updates(article, offset, paths, result)
+        return
+    result.store_changed = True
+
+    from data_scraper.download_wiki_revisions import download_page_w_revisions, validate_page
+
+    with profiling.stage("fetch", article=article) as stage:
+        raw_revisions = download_page_w_revisions(article)
+        if not raw_revisions:
+            raise RuntimeError(f"Downloading the history of {article} failed")
+        validate_page(article, raw_revisions)
+        paths.export.parent.mkdir(parents=True, exist_ok=True)
+        paths.export.write_text(raw_revisions, encoding="utf-8")
+        stage.add("bytes_written", paths.export.stat().st_size)
+    result.log.append(("fetch", article, BUILT))
+
+
+def fetch_updates(article: str, offset: str, paths: ArticlePaths, result: ArticleResult) -> None:
+    """Download the revisions after ``offset``, one update export per request."""
+    from data_scraper.download_wiki_revisions import download_revisions_after
+
+    revisions = 0
+    with profiling.stage("fetch", article=article, offset=offset) as stage:
+        paths.updates.mkdir(parents=True, exist_ok=True)
+        for xml_content, count, last in download_revisions_after(article, offset):
+            path = paths.updates / f"{_file_stamp(last)}.xml"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(xml_content, encoding="utf-8")
+            tmp.replace(path)
+            revisions += count
+            stage.add("revisions", count)
+    if revisions:
+        result.store_changed = True
+    result.log.append(("fetch", f"{article} (+{revisions} revisions)", BUILT if revisions else FRESH))
+
+
+def store(article: str, paths: ArticlePaths, manifest: Manifest, options: PipelineOptions, result: ArticleResult) -> None:
+    exports = export_files(paths)
+    if not exports:
+        # nothing to split: revisions were stored by an earlier run or copied in
+        result.log.append(("store", article, STALE if result.store_changed else FRESH))
+        return
+    stale = {}
+    for export in exports:
+        # export files are written once, so name and size identify them
+        name = "store" if export == paths.export else f"store/{export.name}"
+        key = hash_key("store", STAGE_VERSIONS["store"], export.name, export.stat().st_size)
+        if options.force or not manifest.is_fresh(name, key, [paths.store]):
+            stale[name] = (export, key)
+    label = f"{article} ({len(stale)}/{len(exports)} exports)"
+    if not stale:
+        result.log.append(("store", label, FRESH))
+        return
+    result.store_changed = True
+    if options.dry_run:
+        result.log.append(("store", label, STALE))
+        return
+
+    from tqdm import tqdm
+    from data_scraper.download_wiki_revisions import construct_path, parse_mediawiki_revisions
+
+    with profiling.stage("store", article=article) as stage:
+        for name, (export, key) in stale.items():
+            raw_revisions = export.read_text(encoding="utf-8")
+            for wiki_revision in tqdm(parse_mediawiki_revisions(raw_revisions), desc=f"Storing {article}"):
+                revision_path = construct_path(
+                    wiki_revision=wiki_revision, page_name=article, save_dir=Path(options.data_dir)
+                )
+                stage.add("revisions")
+                if not revision_path.exists():
+                    revision_path.parent.mkdir(parents=True, exist_ok=True)
+                    revision_path.write_text(wiki_revision, encoding="utf-8")
+                    stage.add("files_written")
+            manifest.record(name, key)
+    result.log.append(("store", label, BUILT))
+
+
+def _table_partition(article: str, files: list, options: PipelineOptions):
+    import pandas as pd
+    from data_scraper.xml_to_dataframe import parse_revision_file
+
+    rows = [parse_revision_file(file_path, options.include_text) for file_path in files]
+    df = pd.DataFrame([row for row in rows if row is not None])
+    if not df.empty:
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def _links_partition(article: str, files: list, options: PipelineOptions):
+    import pandas as pd
+    from lxml import etree
+    from utils.network import parse_revision
+
+    rows = []
+    for file_path in files:
+        try:
+            for _, elem in etree.iterparse(str(file_path), tag="revision", events=("end",)):
+                rows.extend(parse_revision(elem, article))
+                elem.clear()
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
+    profiling.add("links", len(rows))
+    return pd.DataFrame(rows, columns=LINK_COLUMNS)
+
+
+def _month_of(file_path: Path) -> str:
+    return f"{file_path.parent.parent.parent.name}-{file_path.parent.parent.name}"
+
+
+def _revision_order(file_path: Path) -> tuple:
+    # file names are revision ids, which grow over time; "999" sorts after "1000" as text
+    return (file_path.parent.name, int(file_path.stem) if file_path.stem.isdigit() else 0, file_path.stem)
+
+
+def _revision_texts(files: list):
+    from lxml import etree
+
+    for file_path in files:
+        try:
+            for _, elem in etree.iterparse(str(file_path), tag="revision", events=("end",)):
+                yield elem.findtext("sha1") or None, elem.findtext("text") or ""
+                elem.clear()
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
+
+
+def _terms_partition(article: str, files: list, options: PipelineOptions):
+    from utils.terms import term_counts, to_frame
+
+    # the first file may be the last revision of the previous month, which is
+    # only the baseline for the first edit of this month
+    month = _month_of(files[-1])
+    baseline_files = [f for f in files[:1] if _month_of(f) != month]
+    baseline = next((text for _, text in _revision_texts(baseline_files)), None)
+    revisions = ((month, sha1, text) for sha1, text in _revision_texts(files[len(baseline_files):]))
+    return to_frame(term_counts(revisions, baseline))
+
+
+PARTITION_BUILDERS = {"table": _table_partition, "links": _links_partition, "terms": _terms_partition}
+
+
+def build_partitions(
+    kind: str,
+    article: str,
+    months: dict,
+    params: dict,
+    paths: ArticlePaths,
+    manifest: Manifest,
+    options: PipelineOptions,
+    result: ArticleResult,
+) -> tuple:
+    """
+    Rebuild the stale monthly partitions of ``kind``. Returns month -> key and
+    the number of stale partitions.
+    """
+    part_dir = paths.cache / kind
+    keys = {}
+    stale = 0
+    for month, files in months.items():
+        key = hash_key(kind, STAGE_VERSIONS[kind], params, month_fingerprint(files))
+        keys[month] = key
+        output = part_dir / f"{month}.feather"
+        name = f"{kind}/{month}"
+        if not options.force and manifest.is_fresh(name, key, [output]):
+            continue
+        stale += 1
+        if options.dry_run:
+            continue
+        with profiling.stage(kind, article=article, month=month) as stage:
+            stage.add("revisions", len(files))
+            _write_feather(PARTITION_BUILDERS[kind](article, files, options), output)
+        manifest.record(name, key)
+
+    # months can disappear when a store is rebuilt from a shorter export
+    for name in [n for n in manifest.entries if n.startswith(f"{kind}/")]:
+        if name.split("/", 1)[1] not in months:
+            stale += 1
+            if not options.dry_run:
+                (part_dir / f"{name.split('/', 1)[1]}.feather").unlink(missing_ok=True)
+                manifest.forget(name)
+
+    status = FRESH if not stale else (STALE if options.dry_run else BUILT)
+    result.log.append((kind, f"{article} ({stale}/{len(months)} months)", status))
+    return keys, stale
+
+
+def table(article: str, paths: ArticlePaths, manifest: Manifest, options: PipelineOptions, result: ArticleResult) -> None:
+    if options.dry_run and result.store_changed:
+        result.log.append(("table", article, STALE))
+        return
+    months = list_months(paths.store)
+    if not months:
+        result.log.append(("table", article, MISSING))
+        return
+    keys, _ = build_partitions(
+        "table", article, months, {"include_text": options.include_text}, paths, manifest, options, result
+    )
+    key = hash_key("table", sorted(keys.items()))
+    if not options.force and manifest.is_fresh("table", key, [paths.table]):
+        result.table_key = key
+        result.log.append(("table", paths.table.name, FRESH))
+        return
+    if options.dry_run:
+        result.log.append(("table", paths.table.name, STALE))
+        return
+
+    import pandas as pd
+
+    with profiling.stage("table_concat", article=article) as stage:
+        parts = [pd.read_feather(paths.cache / "table" / f"{month}.feather") for month in keys]
+        parts = [part for part in parts if not part.empty]
+        if not parts:
+            result.log.append(("table", article, MISSING))
+            return
+        df = pd.concat(parts, ignore_index=True)
+        df = df.sort_values("timestamp", ascending=False)
+        _write_feather(df, paths.table)
+        stage.add("revisions", len(df))
+    manifest.record("table", key)
+    result.table_key = key
+    result.log.append(("table", paths.table.name, BUILT))
+
+
+def links(article: str, paths: ArticlePaths, manifest: Manifest, options: PipelineOptions, result: ArticleResult) -> None:
+    if options.dry_run and result.store_changed:
+        result.log.append(("links", article, STALE))
+        result.links_changed = True
+        return
+    months = list_months(paths.store)
+    if not months:
+        result.log.append(("links", article, MISSING))
+        return
+    result.link_keys, stale = build_partitions("links", article, months, {}, paths, manifest, options, result)
+    result.links_changed = stale > 0
+
+
+def terms(article: str, paths: ArticlePaths, manifest: Manifest, options: PipelineOptions, result: ArticleResult) -> None:
+    if options.dry_run and result.store_changed:
+        result.log.append(("terms", article, STALE))
+        return
+    months = list_months(paths.store)
+    if not months:
+        result.log.append(("terms", article, MISSING))
+        return
+    inputs = {}
+    previous = None
+    for month, files in months.items():
+        files = sorted(files, key=_revision_order)
+        inputs[month] = ([previous] if previous else []) + files
+        previous = files[-1]
+    keys, _ = build_partitions("terms", article, inputs, {}, paths, manifest, options, result)
+    key = hash_key("terms", sorted(keys.items()))
+    if not options.force and manifest.is_fresh("terms", key, [paths.terms]):
+        result.log.append(("terms", paths.terms.name, FRESH))
+        return
+    if options.dry_run:
+        result.log.append(("terms", paths.terms.name, STALE))
+        return
+
+    import pandas as pd
+
+    with profiling.stage("terms_concat", article=article) as stage:
+        df = pd.concat([pd.read_feather(paths.cache / "terms" / f"{month}.feather") for month in keys], ignore_index=True)
+        _write_feather(df, paths.terms)
+        stage.add("rows", len(df))
+    manifest.record("terms", key)
+    result.log.append(("terms", paths.terms.name, BUILT))
+
+
+def build_article(article: str, options: PipelineOptions) -> ArticleResult:
+    """Run fetch, store, table, links and terms for one article."""
+    paths = ArticlePaths(article, options)
+    manifest = Manifest(paths.cache / "manifest.json")
+    result = ArticleResult(article)
+    try:
+        if "fetch" in options.stages:
+            fetch(article, paths, options, result)
+        if "store" in options.stages:
+            store(article, paths, manifest, options, result)
+        if "table" in options.stages or "figures" in options.stages:
+            table(article, paths, manifest, options, result)
+        # edges and rollups are keyed by the link partitions, so they need them too
+        if {"links", "edges", "rollups"} & set(options.stages):
+            links(article, paths, manifest, options, result)
+        if "terms" in options.stages:
+            terms(article, paths, manifest, options, result)
+    finally:
+        if not options.dry_run:
+            manifest.save()
+    return result
+
+
+def build_figures(article: str, table_key: str, options: PipelineOptions) -> tuple:
+    paths = ArticlePaths(article, options)
+    manifest = Manifest(paths.cache / "manifest.json")
+    if table_key is None:
+        return ("figures", article, STALE if options.dry_run else MISSING)
+    key = hash_key("figures", STAGE_VERSIONS["figures"], table_key)
+    if not options.force and manifest.is_fresh("figures", key, [paths.figure]):
+        return ("figures", article, FRESH)
+    if options.dry_run:
+        return ("figures", article, STALE)
+
+    import pandas as pd
+    from utils.plot_graphs import plot_timeseries
+
+    with profiling.stage("figures", article=article):
+        df = pd.read_feather(paths.table, columns=["revision_id", "timestamp"])
+        paths.figure.parent.mkdir(parents=True, exist_ok=True)
+        plot_timeseries(
+            data=df,
+            x="timestamp",
+            y="revision_id",
+            title=f"Wikipedia Page Revisions Over Time - {article.replace('_', ' ')}",
+            x_title="Date",
+            y_title="Number of Revisions",
+            file_path=str(paths.figure),
+            show=False,
+            include_plotlyjs="directory",
+        )
+    manifest.record("figures", key)
+    manifest.save()
+    return ("figures", article, BUILT)
+
+
+# --- cross-article stages ------------------------------------------------------
+
+
+def build_edges(articles: list, results: list, manifest: Manifest, options: PipelineOptions) -> tuple:
+    """
+    Write the Gephi-ready node, edge and nodeEdge tables for all articles from
+    the cached link partitions. Articles get node ids 1..n in the given order.
+    """
+    out_dir = network_dir(options)
+    outputs = [out_dir / name for name in ("node.csv", "nodes_indexed.csv", "edge.csv", "nodeEdge.csv")]
+    if options.dry_run and any(r.links_changed for r in results):
+        return None, ("edges", ", ".join(articles), STALE)
+    key = hash_key("edges", STAGE_VERSIONS["edges"], [(r.article, sorted(r.link_keys.items())) for r in results])
+    if not options.force and manifest.is_fresh("edges", key, outputs):
+        return key, ("edges", ", ".join(articles), FRESH)
+    if options.dry_run:
+        return None, ("edges", ", ".join(articles), STALE)
+
+    import pandas as pd
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    node_index = {article: i for i, article in enumerate(articles, start=1)}
+    edge_id_counter = 1
+    edge_tmp, node_edge_tmp = out_dir / "edge.csv.tmp", out_dir / "nodeEdge.csv.tmp"
+    edge_tmp.unlink(missing_ok=True)
+    node_edge_tmp.unlink(missing_ok=True)
+    with profiling.stage("edges", articles=articles) as stage:
+        for result in results:
+            for month in result.link_keys:
+                path = Path(options.data_dir) / "cache" / result.article / "links" / f"{month}.feather"
+                df = pd.read_feather(path)
+                if df.empty:
+                    continue
+                for title in df["LinkTitle"].unique():
+                    if title not in node_index:
+                        node_index[title] = len(node_index) + 1
+                df.insert(0, "edgeId", range(edge_id_counter, edge_id_counter + len(df)))
+                edge_id_counter += len(df)
+                first = not edge_tmp.exists()
+                edges = pd.DataFrame({
+                    "edgeId": df["edgeId"],
+                    "revId": df["revId"],
+                    "TimeStamp": df["TimeStamp"],
+                    "source": node_index[result.article],
+                    "target": df["LinkTitle"].map(node_index),
+                    "Year": df["Year"],
+                    "Month": df["Month"],
+                    "Day": df["Day"],
+                    "LinkType": df["LinkType"],
+                })
+                edges.to_csv(edge_tmp, mode="a", header=first, index=False)
+                df.to_csv(node_edge_tmp, mode="a", header=first, index=False)
+                stage.add("links", len(df))
+
+        if not edge_tmp.exists():
+            pd.DataFrame(columns=["edgeId", "revId", "TimeStamp", "source", "target", "Year", "Month", "Day", "LinkType"]).to_csv(edge_tmp, index=False)
+            pd.DataFrame(columns=["edgeId"] + LINK_COLUMNS).to_csv(node_edge_tmp, index=False)
+        nodes = pd.DataFrame({"Id": list(node_index.values()), "Label": list(node_index.keys())})
+        nodes.to_csv(out_dir / "node.csv", index=False)
+        nodes.to_csv(out_dir / "nodes_indexed.csv")
+        edge_tmp.replace(out_dir / "edge.csv")
+        node_edge_tmp.replace(out_dir / "nodeEdge.csv")
+        stage.add("nodes", len(nodes))
+    manifest.record("edges", key)
+    return key, ("edges", ", ".join(articles), BUILT)
+
+
+def build_rollups(edges_key: str, manifest: Manifest, options: PipelineOptions) -> tuple:
+    out_dir = network_dir(options)
+    window_date, window_days = options.edge_window
+    outputs = [
+        out_dir / f"TK_Edge_{options.edge_cutoff}.csv",
+        out_dir / f"TK_NewlyConnectedNodes_{options.newly_connected_after}.csv",
+        out_dir / f"UniqueEdgesBefore_{window_date}.csv",
+        out_dir / f"NewEdgesWithinRange_{window_date}_Range_{window_days}.csv",
+    ]
+    if edges_key is None:
+        return ("rollups", str(out_dir), STALE if options.dry_run else MISSING)
+    params = [options.edge_cutoff, options.newly_connected_after, window_date, window_days]
+    key = hash_key("rollups", STAGE_VERSIONS["rollups"], edges_key, params)
+    if not options.force and manifest.is_fresh("rollups", key, outputs):
+        return ("rollups", str(out_dir), FRESH)
+    if options.dry_run:
+        return ("rollups", str(out_dir), STALE)
+
+    import pandas as pd
+    from utils import network
+
+    edges_file = str(out_dir / "edge.csv")
+    nodes = pd.read_csv(out_dir / "node.csv")
+    id_to_label = dict(zip(nodes["Id"], nodes["Label"]))
+    with profiling.stage("rollups"):
+        network.filter_and_aggregate_edges(edges_file, options.edge_cutoff, output_dir=str(out_dir))
+        network.filter_newly_connected_nodes(edges_file, options.newly_connected_after, output_dir=str(out_dir))
+        network.generate_edge_csvs(edges_file, window_date, window_days, id_to_label, output_dir=str(out_dir))
+    manifest.record("rollups", key)
+    return ("rollups", str(out_dir), BUILT)
+
+
+# --- orchestration ---------------------------------------------------------------
+
+
+def run_pipeline(articles: list, options: PipelineOptions = None) -> list:
+    """
+    Bring the requested stages up to date for ``articles`` and return the
+    (stage, artifact, status) log. Raises if any stage fails.
+    """
+    options = options or PipelineOptions()
+    results = profiling.map_in_workers(build_article, [(article, options) for article in articles], options.workers)
+    log = [entry for result in results for entry in result.log]
+
+    manifest = Manifest(Path(options.data_dir) / "cache" / "manifest.json")
+    edges_key = None
+    if "edges" in options.stages or "rollups" in options.stages:
+        edges_key, entry = build_edges(articles, results, manifest, options)
+        if "edges" in options.stages:
+            log.append(entry)
+    if "rollups" in options.stages:
+        log.append(build_rollups(edges_key, manifest, options))
+    if not options.dry_run:
+        manifest.save()
+
+    if "figures" in options.stages:
+        if not options.dry_run:
+            from utils.plot_graphs import write_plotlyjs
+
+            # the figures share one plotly-<version>.min.js; write it before the workers start
+            write_plotlyjs(str(options.output_dir))
+        log += profiling.map_in_workers(build_figures, [(r.article, r.table_key, options) for r in results], options.workers)
+    return log
+
+
+def format_log(log: list, dry_run: bool = False) -> str:
+    output = ["Dry run, nothing was built:" if dry_run else "Pipeline summary:"]
+    for stage in STAGES:
+        for entry_stage, artifact, status in log:
+            if entry_stage == stage:
+                output.append(f"  {stage:<8} {artifact:<40} {status}")
+    return "\n".join(output)
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Build (or refresh) the Wikipedia revision pipeline for the given articles",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("articles", nargs="+", help="Titles of the Wikipedia pages")
+    parser.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory for revisions, tables and caches")
+    parser.add_argument("--output-dir", type=Path, default=Path(OUTPUT_DIR), help="Directory for figures")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to bring up to date")
+    parser.add_argument("--include-text", action="store_true", help="Include full text content in the revision tables")
+    parser.add_argument("--refresh", action="store_true", help="Download the revisions made since the last fetch")
+    parser.add_argument("--force", action="store_true", help="Rebuild every artifact even if it is up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which artifacts would be rebuilt")
+    parser.add_argument("--workers", type=int, default=profiling.default_workers(), help="Articles processed in parallel")
+    parser.add_argument("--edge-cutoff", default="2012-07-01", help="Cutoff date for TK_Edge_<date>.csv")
+    parser.add_argument("--newly-connected-after", default="2006-12-30", help="Cutoff date for TK_NewlyConnectedNodes_<date>.csv")
+    parser.add_argument("--edge-window", nargs=2, default=["2009-09-11", "30"], metavar=("DATE", "DAYS"), help="Window for NewEdgesWithinRange_*.csv")
+    parser.add_argument("--profile", action="store_true", help="Write a timing/memory report to output/profiling (or $WIKI_PROFILE_DIR)")
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable()
+
+    options = PipelineOptions(
+        data_dir=args.data_dir,
+        output_dir=args.output_dir,
+        stages=tuple(args.stages),
+        include_text=args.include_text,
+        refresh=args.refresh,
+        force=args.force,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        edge_cutoff=args.edge_cutoff,
+        newly_connected_after=args.newly_connected_after,
+        edge_window=(args.edge_window[0], int(args.edge_window[1])),
+    )
+    log = run_pipeline(args.articles, options)
+    print(format_log(log, dry_run=options.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,23 @@
-import os
 import argparse
+import os
+import sys
 from pathlib import Path
-import pandas as pd
-from bs4 import BeautifulSoup
-# from config import *
-from tqdm import tqdm
 
-CURR_DIR = os.path.dirname(os.path.abspath(__file__)).replace("\\", "/")
-PROJECT_ROOT =  os.path.dirname(CURR_DIR).replace("\\", "/")
+if __name__ == "__main__":
+    # run as a script: put scripts/ first so config, utils and the data_scraper
+    # package (rather than data_scraper.py next to this file) can be imported
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-DATA_DIR = os.path.join(PROJECT_ROOT, 'data').replace("\\", "/")
-OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'output').replace("\\", "/")
+from config import DATA_DIR
+from utils import profiling
 
-print(CURR_DIR)
+# pandas, bs4 and tqdm are imported inside the functions that use them so
+# that --help and argument errors return without loading them
 
 def parse_revision_xml(xml_content: str, include_text: bool = False) -> dict:
     """Parse a single revision XML string into a dictionary."""
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(xml_content, "lxml-xml")
     revision = soup.find("revision")
     
@@ -33,6 +35,12 @@ def parse_revision_xml(xml_content: str, include_text: bool = False) -> dict:
     # Find text content
     text_elem = revision.find("text")
     text_content = text_elem.text if text_elem else ""
+
+    # sha1 and size of the text as reported by MediaWiki, so reverts can be
+    # found without the text (both are empty for deleted revisions)
+    sha1 = revision.find("sha1")
+    sha1 = sha1.text if sha1 is not None and sha1.text else None
+    size = text_elem.get("bytes") if text_elem is not None else None
     
     # Extract basic revision information
     data = {
@@ -41,7 +49,9 @@ def parse_revision_xml(xml_content: str, include_text: bool = False) -> dict:
         'username': username,
         'userid': userid,
         'comment': revision.find("comment").text if revision.find("comment") else None,  
-        'text_length': len(text_content)
+        'text_length': len(text_content),
+        'sha1': sha1,
+        'bytes': int(size) if size is not None else len(text_content.encode('utf-8')),
     }
     
     # Optionally include the full text content
@@ -50,8 +60,28 @@ def parse_revision_xml(xml_content: str, include_text: bool = False) -> dict:
     
     return data
 
-def process_article_directory(article_dir: Path, batch_size: int = 1000, include_text: bool = False) -> pd.DataFrame:
+def parse_revision_file(file_path: Path, include_text: bool = False) -> dict:
+    """Parse one stored revision file, adding the year/month/day of its folder."""
+    try:
+        xml_content = file_path.read_text(encoding='utf-8')
+        data = parse_revision_xml(xml_content, include_text)
+        if profiling.is_enabled():
+            profiling.add("files")
+            profiling.add("bytes_read", len(xml_content.encode('utf-8')))
+        # Add file path information
+        data['year'] = file_path.parent.parent.parent.name
+        data['month'] = file_path.parent.parent.name
+        data['day'] = file_path.parent.name
+        return data
+    except Exception as e:
+        print(f"Error processing {file_path}: {str(e)}")
+        return None
+
+def process_article_directory(article_dir: Path, batch_size: int = 1000, include_text: bool = False) -> "pd.DataFrame":
     """Process all revisions for an article into a single DataFrame."""
+    import pandas as pd
+    from tqdm import tqdm
+
     # Collect all XML files for this article
     xml_files = []
     print(article_dir)
@@ -79,19 +109,13 @@ def process_article_directory(article_dir: Path, batch_size: int = 1000, include
         revision_data = []
         
         for file_path in batch:
-            try:
-                xml_content = file_path.read_text(encoding='utf-8')
-                data = parse_revision_xml(xml_content, include_text)
-                # Add file path information
-                data['year'] = file_path.parent.parent.parent.name
-                data['month'] = file_path.parent.parent.name
-                data['day'] = file_path.parent.name
+            data = parse_revision_file(file_path, include_text)
+            if data is not None:
                 revision_data.append(data)
-            except Exception as e:
-                print(f"Error processing {file_path}: {str(e)}")
         
         if revision_data:
             dataframes.append(pd.DataFrame(revision_data))
+            profiling.add("revisions", len(revision_data))
     
     if not dataframes:
         return None
@@ -101,7 +125,7 @@ def process_article_directory(article_dir: Path, batch_size: int = 1000, include
     final_df['timestamp'] = pd.to_datetime(final_df['timestamp'])
     return final_df.sort_values('timestamp', ascending=False)
 
-def print_summary(df: pd.DataFrame, article_name: str, include_text: bool):
+def print_summary(df: "pd.DataFrame", article_name: str, include_text: bool):
     """Print summary statistics for an article's DataFrame."""
     print(f"\nSummary for {article_name}:")
     print(f"Total revisions: {len(df)}")
@@ -112,6 +136,15 @@ def print_summary(df: pd.DataFrame, article_name: str, include_text: bool):
         memory_usage = df['text'].memory_usage(deep=True) / (1024 * 1024)  # Convert to MB
         print(f"Text content memory usage: {memory_usage:.1f} MB")
 
+def is_article_dir(path: Path) -> bool:
+    """
+    True for a folder in the <article>/yyyy/mm/dd/<revision id>.xml layout of
+    download_wiki_revisions.py. The data directory also holds DataFrames/ and
+    the pipeline's exports/, cache/, network/, terms/ and reverts/ folders.
+    """
+    return path.is_dir() and any(path.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/*.xml"))
+
+
 def main(data_dir: Path, output_dir: Path, batch_size: int = 1000, include_text: bool = False):
     """
     Process all article directories into separate DataFrames.
@@ -124,13 +157,18 @@ def main(data_dir: Path, output_dir: Path, batch_size: int = 1000, include_text:
     print(f"Processing with {'text content' if include_text else 'text length only'}")
     
     for article_dir in data_dir.iterdir():
-        if not article_dir.is_dir():
+        if not is_article_dir(article_dir):
             continue
-        df = process_article_directory(article_dir, batch_size, include_text)
+        with profiling.stage("convert", article=article_dir.name, batch_size=batch_size, include_text=include_text):
+            df = process_article_directory(article_dir, batch_size, include_text)
         
         if df is not None:
             output_path = output_dir / f"{article_dir.name}.feather"
-            df.to_feather(output_path)
+            with profiling.stage("write_feather", article=article_dir.name) as stage:
+                df.to_feather(output_path)
+                stage.add("revisions", len(df))
+                if profiling.is_enabled():
+                    stage.add("bytes_written", output_path.stat().st_size)
             print_summary(df, article_dir.name, include_text)
 
 if __name__ == "__main__":
@@ -161,5 +199,12 @@ if __name__ == "__main__":
         action="store_true",
         help="Include full text content in the DataFrame (significantly increases file size)",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write a timing/memory report to output/profiling (or $WIKI_PROFILE_DIR)",
+    )
     args = parser.parse_args()
+    if args.profile:
+        profiling.enable()
     main(args.data_dir, args.output_dir, args.batch_size, args.include_text)
@@ -0,0 +1,49 @@
+"""Pipeline stages on a small synthetic revision store."""
+
+import pytest
+
+from benchmarks.synthetic import ExportSpec, write_revision_store
+from data_scraper.pipeline import PipelineOptions, run_pipeline
+
+
+@pytest.fixture
+def built_tree(tmp_path):
+    data_dir, output_dir = tmp_path / "data", tmp_path / "output"
+    spec = ExportSpec(title="Taylor_Swift", revisions=120, article_size=4000, mean_gap_hours=24 * 60, seed=3)
+    write_revision_store(spec, data_dir)
+    options = PipelineOptions(data_dir=data_dir, output_dir=output_dir, stages=("table", "links", "edges", "rollups"))
+    run_pipeline([spec.title], options)
+    return options
+
+
+def test_rollups_alone_keep_the_network_tables(built_tree):
+    network = built_tree.data_dir / "network"
+    tables = ("node.csv", "nodes_indexed.csv", "edge.csv", "nodeEdge.csv")
+    before = {name: (network / name).read_bytes() for name in tables}
+    assert before["edge.csv"].count(b"\n") > 1
+
+    log = run_pipeline(["Taylor_Swift"], PipelineOptions(
+        data_dir=built_tree.data_dir, output_dir=built_tree.output_dir, stages=("rollups",)
+    ))
+
+    assert {name: (network / name).read_bytes() for name in tables} == before
+    assert [status for stage, _, status in log if stage == "rollups"] == ["fresh"]
+
+
+def test_table_revisions_are_counted_once(tmp_path, monkeypatch):
+    from utils import profiling
+
+    spec = ExportSpec(title="Kanye_West", revisions=80, article_size=2000, mean_gap_hours=24 * 30, seed=5)
+    write_revision_store(spec, tmp_path / "data")
+    monkeypatch.setenv(profiling.ENV_DIR, str(tmp_path / "profiling"))
+    profiling.reset()
+    profiling.enable()
+    try:
+        run_pipeline([spec.title], PipelineOptions(data_dir=tmp_path / "data", output_dir=tmp_path, stages=("table",)))
+        stages = profiling.summarize(profiling.collect())["stages"]
+    finally:
+        profiling.disable()
+        profiling.reset()
+
+    assert stages["table"]["counters"]["revisions"] == spec.revisions
+    assert stages["table_concat"]["counters"]["revisions"] == spec.revisions
@@ -0,0 +1,24 @@
+"""Downsampling of long time series before plotting."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.plot_graphs import downsample_minmax
+
+
+@pytest.mark.parametrize("n", [5, 100, 1001, 4003, 20_000])
+@pytest.mark.parametrize("max_points", [1, 2, 3, 4, 5, 10, 101, 4000])
+def test_downsample_minmax_respects_the_point_budget(n, max_points):
+    data = pd.DataFrame({"x": np.arange(n), "y": np.random.default_rng(n).normal(size=n)})
+    out = downsample_minmax(data, "y", max_points)
+    assert len(out) <= max_points
+    assert out["x"].is_monotonic_increasing
+
+
+def test_downsample_minmax_keeps_the_ends_and_spikes():
+    y = np.zeros(10_000)
+    y[1234], y[8765] = 50.0, -50.0
+    data = pd.DataFrame({"x": np.arange(len(y)), "y": y})
+    out = downsample_minmax(data, "y", 100)
+    assert {0, 1234, 8765, len(y) - 1} <= set(out["x"])
@@ -0,0 +1,22 @@
+"""Profiling records and the files they point to."""
+
+from utils import profiling
+
+
+def test_stage_profiles_within_one_second_keep_separate_files(tmp_path, monkeypatch):
+    monkeypatch.setenv(profiling.ENV_DIR, str(tmp_path))
+    monkeypatch.setenv(profiling.ENV_PROFILER, "cprofile")
+    profiling.reset()
+    profiling.enable()
+    try:
+        for _ in range(5):
+            with profiling.stage("table"):
+                sum(range(1000))
+        records = profiling.collect()
+    finally:
+        profiling.disable()
+        profiling.reset()
+
+    paths = [record["profile_path"] for record in records]
+    assert len(set(paths)) == 5
+    assert all((tmp_path / path).exists() for path in paths)
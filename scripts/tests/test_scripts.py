@@ -0,0 +1,25 @@
+"""The documented ``python scripts/...`` entry points start without installing."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+SCRIPTS = [
+    "wikianalysis.py",
+    "data_scraper/data_scraper.py",
+    "data_scraper/pipeline.py",
+    "data_scraper/download_wiki_revisions.py",
+    "data_scraper/xml_to_dataframe.py",
+]
+
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_help_runs_from_any_directory(script, tmp_path):
+    completed = subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / script), "--help"], cwd=tmp_path, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.startswith("usage:")
@@ -1,2 +1,27 @@
 # utils/__init__.py
-from .utils import *
\ No newline at end of file
+# The helpers in utils.py (pandas, pyarrow) are loaded on first use so that
+# importing a light module such as utils.profiling stays cheap.
+import importlib
+import importlib.util
+
+# what "from utils import *" used to pull in from utils.py
+__all__ = [
+    "read_feather_in_chunks",
+    "read_feather_data",
+    "preprocess",
+    "find_text_differences",
+    "find_text_differences_2",
+]
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    # "from utils import profiling" asks for the submodule as an attribute first
+    if importlib.util.find_spec(f"{__name__}.{name}") is not None:
+        return importlib.import_module(f".{name}", __name__)
+    helpers = importlib.import_module(".utils", __name__)
+    try:
+        return getattr(helpers, name)
+    except AttributeError:
+        raise AttributeError(f"module 'utils' has no attribute '{name}'") from None
@@ -0,0 +1,497 @@
+"""
+Edit-burst and change-point detection on the edit counts of an article.
+
+Edits are counted per period (day by default) and scanned with:
+    kleinberg  two-or-more state burst model (Kleinberg 2002) with a Poisson
+               rate per state, decoded with Viterbi
+    pelt       optimal Poisson change points (Killick et al. 2012)
+    cusum      online Poisson CUSUM in ``BurstMonitor``; its state is saved
+               between runs so newly synced edits are processed on their own
+
+Every method returns ``Event`` records with start/end, magnitude (observed /
+expected edits) and a one-sided p-value from the Poisson likelihood ratio.
+``to_annotations`` turns them into the {"x", "y", "text"} dictionaries taken
+by ``plot_timeseries_with_annotations``, and ``scan_articles`` runs the
+detection over many articles in parallel.
+"""
+
+import json
+import math
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import profiling
+
+METHODS = ("kleinberg", "pelt", "cusum")
+
+
+@dataclass
+class Event:
+    article: str
+    method: str
+    kind: str  # "burst" or "change"
+    start: pd.Timestamp
+    end: pd.Timestamp
+    peak: pd.Timestamp
+    peak_count: int
+    edits: int
+    expected: float
+    magnitude: float
+    p_value: float
+
+    def as_dict(self) -> dict:
+        row = asdict(self)
+        for key in ("start", "end", "peak"):
+            row[key] = pd.Timestamp(row[key]).isoformat()
+        return row
+
+
+def _naive(timestamps) -> pd.DatetimeIndex:
+    timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_convert(None)
+    return timestamps
+
+
+def edit_counts(timestamps, freq: str = "D") -> pd.Series:
+    """Number of edits per period, including the periods without edits."""
+    timestamps = _naive(timestamps)
+    if len(timestamps) == 0:
+        return pd.Series(dtype="int64", index=pd.PeriodIndex([], freq=freq))
+    periods = timestamps.to_period(freq)
+    counts = pd.Series(1, index=periods).groupby(level=0).sum()
+    return counts.reindex(pd.period_range(counts.index.min(), counts.index.max(), freq=freq), fill_value=0)
+
+
+def poisson_p_value(observed: float, expected: float) -> float:
+    """One-sided p-value of seeing ``observed`` or more edits when ``expected`` were due."""
+    if expected <= 0:
+        return 0.0 if observed > 0 else 1.0
+    if observed <= expected:
+        return 1.0
+    llr = observed * math.log(observed / expected) - (observed - expected)
+    return 0.5 * math.erfc(math.sqrt(llr))
+
+
+def trailing_mean(counts: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the ``window`` periods before each period (expanding at the start)."""
+    cumsum = np.concatenate(([0.0], np.cumsum(counts, dtype=float)))
+    idx = np.arange(len(counts))
+    lo = np.maximum(idx - window, 0)
+    n = idx - lo
+    mean = np.divide(cumsum[idx] - cumsum[lo], n, out=np.zeros(len(counts)), where=n > 0)
+    mean[0] = counts[0] if len(counts) else 0
+    return mean
+
+
+def _burst_runs(mask: np.ndarray) -> list:
+    """(start, end) index pairs, inclusive, of the runs of True in ``mask``."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1))
+
+
+def kleinberg_bursts(
+    counts: pd.Series,
+    article: str = None,
+    s: float = 2.0,
+    gamma: float = 1.0,
+    levels: int = 2,
+    window: int = 90,
+) -> list:
+    """
+    Kleinberg burst detection on a per-period count series. State ``i`` emits
+    edits at ``s**i`` times the baseline (the mean of the previous ``window``
+    periods, or of the whole series if ``window`` is None). Moving up a state
+    costs ``gamma * log(n)``; moving down is free.
+    """
+    values = counts.to_numpy(dtype=float)
+    n = len(values)
+    if n < 2 or values.sum() == 0:
+        return []
+    base = np.full(n, values.mean()) if window is None else trailing_mean(values, window)
+    base = np.maximum(base, 1.0 / max(window or n, 1))
+
+    rates = base[:, None] * s ** np.arange(levels + 1)[None, :]  # n x states
+    emission = rates - values[:, None] * np.log(rates)
+    steps = np.arange(levels + 1)
+    up = steps[None, :] - steps[:, None]
+    transition = np.where(up > 0, up * gamma * math.log(n), 0.0)
+
+    cost = emission[0] + transition[0]
+    back = np.zeros((n, levels + 1), dtype=np.int64)
+    for t in range(1, n):
+        total = cost[:, None] + transition
+        back[t] = total.argmin(axis=0)
+        cost = total[back[t], steps] + emission[t]
+    states = np.empty(n, dtype=np.int64)
+    states[-1] = cost.argmin()
+    for t in range(n - 1, 0, -1):
+        states[t - 1] = back[t, states[t]]
+
+    events = []
+    index = counts.index
+    for start, end in _burst_runs(states > 0):
+        window_values = values[start : end + 1]
+        edits = window_values.sum()
+        expected = base[start : end + 1].sum()
+        peak = start + int(window_values.argmax())
+        events.append(Event(
+            article=article,
+            method="kleinberg",
+            kind="burst",
+            start=index[start].start_time,
+            end=index[end].end_time.floor("s"),
+            peak=index[peak].start_time,
+            peak_count=int(values[peak]),
+            edits=int(edits),
+            expected=float(expected),
+            magnitude=float(edits / expected),
+            p_value=poisson_p_value(edits, expected),
+        ))
+    return events
+
+
+def _poisson_cost(total: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """Twice the negative Poisson log-likelihood of segments (constants dropped)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xlogx = np.where(total > 0, total * np.log(total / length), 0.0)
+    return 2 * (total - xlogx)
+
+
+def pelt_change_points(values: np.ndarray, penalty: float = None, min_size: int = 3) -> list:
+    """
+    Indexes where a new Poisson segment starts, found with PELT. The default
+    penalty is ``2 log(n)`` scaled by the over-dispersion of the counts, as
+    edit counts vary far more than a Poisson process would.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 2 * min_size or values.sum() == 0:
+        return []
+    if penalty is None:
+        dispersion = np.var(np.diff(values)) / (2 * values.mean())
+        penalty = 2 * math.log(n) * max(1.0, dispersion)
+
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    last = np.zeros(n + 1, dtype=np.int64)
+    candidates = np.array([0])
+    for t in range(min_size, n + 1):
+        segment = _poisson_cost(cumsum[t] - cumsum[candidates], t - candidates)
+        total = best[candidates] + segment + penalty
+        i = total.argmin()
+        best[t] = total[i]
+        last[t] = candidates[i]
+        # PELT pruning: a start that cannot beat the optimum now never will
+        candidates = np.append(candidates[best[candidates] + segment <= best[t]], t - min_size + 1)
+
+    change_points = []
+    t = n
+    while t > 0:
+        t = last[t]
+        if t > 0:
+            change_points.append(int(t))
+    return change_points[::-1]
+
+
+def pelt_changes(
+    counts: pd.Series, article: str = None, penalty: float = None, min_size: int = 3, max_periods: int = 5000
+) -> list:
+    """
+    Level changes in the edit rate, one ``Event`` per new segment. PELT is
+    quadratic on series without changes, so longer series are searched in
+    blocks of consecutive periods summed to at most ``max_periods`` points.
+    """
+    values = counts.to_numpy(dtype=float)
+    block = -(-len(values) // max_periods)
+    if block > 1:
+        blocks = np.add.reduceat(values, np.arange(0, len(values), block))
+        change_points = [cp * block for cp in pelt_change_points(blocks, penalty, min_size)]
+    else:
+        change_points = pelt_change_points(values, penalty, min_size)
+    bounds = [0] + change_points + [len(values)]
+    events = []
+    index = counts.index
+    for before, start, end in zip(bounds, bounds[1:], bounds[2:]):
+        previous, current = values[before:start], values[start:end]
+        base_rate = max(previous.mean(), 1.0 / len(previous))
+        expected = base_rate * len(current)
+        edits = current.sum()
+        # likelihood ratio of two segments against one merged segment
+        llr = (
+            _poisson_cost(np.array(previous.sum() + edits), np.array(end - before))
+            - _poisson_cost(np.array(previous.sum()), np.array(start - before))
+            - _poisson_cost(np.array(edits), np.array(end - start))
+        ) / 2
+        events.append(Event(
+            article=article,
+            method="pelt",
+            kind="change",
+            start=index[start].start_time,
+            end=index[end - 1].end_time.floor("s"),
+            peak=index[start].start_time,
+            peak_count=int(values[start]),
+            edits=int(edits),
+            expected=float(expected),
+            magnitude=float(current.mean() / base_rate),
+            p_value=float(math.erfc(math.sqrt(max(float(llr), 0.0)))),
+        ))
+    return events
+
+
+@dataclass
+class BurstMonitor:
+    """
+    Online Poisson CUSUM over per-period edit counts.
+
+    The baseline rate is an exponentially weighted mean with a half-life of
+    ``halflife`` periods. A period adds ``count * log(shift) - (shift - 1) * baseline``
+    to the score (the log-likelihood ratio of a ``shift``-fold rate); the score
+    never drops below zero and a burst is reported once it passes
+    ``threshold``. The burst ends when the score is back at zero.
+
+    ``update`` only looks at edits newer than the last one it has seen, and the
+    whole state round-trips through ``to_dict``/``from_dict``, so a run after a
+    sync costs as much as the new edits. The newest period stays open until an
+    edit in a later period arrives.
+    """
+
+    article: str = None
+    freq: str = "D"
+    shift: float = 2.0
+    threshold: float = 10.0
+    halflife: float = 30.0
+    warmup: int = 14
+    last_seen: str = None
+    period: str = None
+    pending: int = 0
+    periods_seen: int = 0
+    baseline: float = None
+    score: float = 0.0
+    alarm: bool = False
+    run: dict = None
+    events: list = field(default_factory=list)
+
+    def _period(self, value) -> pd.Period:
+        return pd.Period(pd.Timestamp(value), freq=self.freq)
+
+    def _close(self, period: pd.Period, count: int) -> list:
+        """Feed one finished period to the detector; returns the bursts it ends."""
+        self.periods_seen += 1
+        if self.baseline is None:
+            self.baseline = float(count)
+            return []
+        rate = max(self.baseline, 1.0 / self.halflife)
+        self.baseline += (1 - 0.5 ** (1 / self.halflife)) * (count - self.baseline)
+        if self.periods_seen <= self.warmup:
+            return []
+
+        increment = count * math.log(self.shift) - (self.shift - 1) * rate
+        score = max(0.0, self.score + increment)
+        if self.score == 0 and score > 0:
+            self.run = {"start": str(period.start_time), "edits": 0, "expected": 0.0, "peak": None, "peak_count": -1}
+        self.score = score
+        finished = []
+        if score > 0:
+            run = self.run
+            if increment > 0:
+                run["end"] = str(period.end_time.floor("s"))
+                run["edits"] += count
+                run["expected"] += rate
+                if count > run["peak_count"]:
+                    run["peak"], run["peak_count"] = str(period.start_time), count
+            self.alarm = self.alarm or score > self.threshold
+        else:
+            if self.alarm:
+                finished.append(self._event(self.run))
+            self.alarm, self.run = False, None
+        return finished
+
+    def _event(self, run: dict) -> Event:
+        return Event(
+            article=self.article,
+            method="cusum",
+            kind="burst",
+            start=pd.Timestamp(run["start"]),
+            end=pd.Timestamp(run["end"]),
+            peak=pd.Timestamp(run["peak"]),
+            peak_count=int(run["peak_count"]),
+            edits=int(run["edits"]),
+            expected=float(run["expected"]),
+            magnitude=float(run["edits"] / run["expected"]),
+            p_value=poisson_p_value(run["edits"], run["expected"]),
+        )
+
+    def update(self, timestamps) -> list:
+        """Process the edits newer than the last call; returns the bursts that ended."""
+        timestamps = _naive(timestamps)
+        if self.last_seen is not None:
+            timestamps = timestamps[timestamps > pd.Timestamp(self.last_seen)]
+        if len(timestamps) == 0:
+            return []
+        self.last_seen = str(timestamps.max())
+        counts = pd.Series(1, index=timestamps.to_period(self.freq)).groupby(level=0).sum()
+
+        finished = []
+        current = self._period(self.period) if self.period is not None else None
+        for period, count in counts.items():
+            if current is None:
+                current, self.pending = period, 0
+            elif period > current:
+                finished += self._close(current, self.pending)
+                for gap in range(1, period.ordinal - current.ordinal):
+                    finished += self._close(current + gap, 0)
+                current, self.pending = period, 0
+            self.pending += int(count)
+        self.period = str(current.start_time)
+        self.events += [event.as_dict() for event in finished]
+        return finished
+
+    def open_burst(self) -> Event:
+        """The burst in progress, if the score is above the threshold."""
+        return self._event(self.run) if self.alarm else None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "BurstMonitor":
+        return cls(**state)
+
+
+def detect_events(
+    timestamps,
+    article: str = None,
+    freq: str = "D",
+    methods: tuple = ("kleinberg", "pelt"),
+    alpha: float = 0.01,
+    **params,
+) -> list:
+    """
+    Run the batch detectors on edit timestamps and keep the events with a
+    p-value below ``alpha``. ``params`` go to the detector of the same prefix,
+    e.g. ``kleinberg_gamma=2`` or ``pelt_min_size=14``.
+    """
+    counts = edit_counts(timestamps, freq)
+    options = {method: {} for method in METHODS}
+    for name, value in params.items():
+        method, _, key = name.partition("_")
+        options[method][key] = value
+
+    events = []
+    if "kleinberg" in methods:
+        events += kleinberg_bursts(counts, article, **options["kleinberg"])
+    if "pelt" in methods:
+        events += pelt_changes(counts, article, **options["pelt"])
+    if "cusum" in methods:
+        monitor = BurstMonitor(article=article, freq=freq, **options["cusum"])
+        events += monitor.update(timestamps)
+        if monitor.open_burst() is not None:
+            events.append(monitor.open_burst())
+    return [event for event in events if event.p_value < alpha]
+
+
+def to_annotations(events: list, monthly_counts: pd.Series = None, top: int = None, x_format: str = "%Y-%m") -> list:
+    """
+    Plot annotations for ``plot_timeseries_with_annotations``. With the
+    monthly counts of the plotted series the labels sit on the line;
+    otherwise at the count of the peak period (use ``x_format="%Y-%m-%d"``
+    on a daily plot). Only the largest event of a month is labelled, and
+    ``top`` keeps the largest months.
+    """
+    events = [event if isinstance(event, Event) else Event(**event) for event in events]
+    by_month = {}
+    for event in sorted(events, key=lambda event: event.magnitude, reverse=True):
+        by_month.setdefault(f"{pd.Timestamp(event.peak):%Y-%m}", event)
+    events = list(by_month.values())[:top]
+    annotations = []
+    for event in sorted(events, key=lambda event: pd.Timestamp(event.peak)):
+        peak = pd.Timestamp(event.peak)
+        y = event.peak_count
+        if monthly_counts is not None:
+            y = int(monthly_counts.get(pd.Period(peak, freq="M"), y))
+        label = "edit burst" if event.kind == "burst" else "edit rate"
+        annotations.append({"x": peak.strftime(x_format), "y": y, "text": f"{peak:%b %Y}: {label} x{event.magnitude:.1f}"})
+    return annotations
+
+
+def load_timestamps(article: str, data_dir) -> pd.Series:
+    """Revision timestamps from ``<data_dir>/DataFrames/<article>.feather``."""
+    path = Path(data_dir) / "DataFrames" / f"{article}.feather"
+    return pd.read_feather(path, columns=["timestamp"])["timestamp"]
+
+
+MONITOR_PARAMETERS = ("freq", "shift", "threshold", "halflife", "warmup")
+
+
+def monitor_path(article: str, data_dir) -> Path:
+    return Path(data_dir) / "cache" / article / "burst_monitor.json"
+
+
+def update_monitor(article: str, data_dir, reset: bool = False, **params) -> list:
+    """
+    Feed the edits synced since the last call to the article's saved
+    ``BurstMonitor`` and return all bursts it has found so far. A state saved
+    with other parameters (freq, shift, threshold, halflife, warmup) is
+    discarded and the detector starts over on all edits.
+    """
+    path = monitor_path(article, data_dir)
+    monitor = BurstMonitor(article=article, **params)
+    if path.exists() and not reset:
+        saved = BurstMonitor.from_dict(json.loads(path.read_text(encoding="utf-8")))
+        if all(getattr(saved, name) == getattr(monitor, name) for name in MONITOR_PARAMETERS):
+            monitor = saved
+    with profiling.stage("events_cusum", article=article) as stage:
+        timestamps = load_timestamps(article, data_dir)
+        new = monitor.update(timestamps)
+        stage.add("revisions", len(timestamps))
+        stage.add("events", len(new))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(monitor.to_dict(), indent=1), encoding="utf-8")
+    tmp.replace(path)
+    events = [Event(**{**event, "start": pd.Timestamp(event["start"]), "end": pd.Timestamp(event["end"]),
+                       "peak": pd.Timestamp(event["peak"])}) for event in monitor.events]
+    if monitor.open_burst() is not None:
+        events.append(monitor.open_burst())
+    return events
+
+
+def article_events(article: str, data_dir, freq: str = "D", methods: tuple = ("kleinberg", "pelt"), alpha: float = 0.01, **params) -> list:
+    """Batch detectors on the stored table, plus the saved monitor if "cusum" is asked for."""
+    events = []
+    batch = tuple(method for method in methods if method != "cusum")
+    if batch:
+        with profiling.stage("events", article=article) as stage:
+            timestamps = load_timestamps(article, data_dir)
+            events += detect_events(timestamps, article, freq, batch, alpha, **params)
+            stage.add("revisions", len(timestamps))
+            stage.add("events", len(events))
+    if "cusum" in methods:
+        cusum = {key[len("cusum_"):]: value for key, value in params.items() if key.startswith("cusum_")}
+        events += [e for e in update_monitor(article, data_dir, freq=freq, **cusum) if e.p_value < alpha]
+    return events
+
+
+def _scan_one(article, data_dir, freq, methods, alpha, params):
+    return article_events(article, data_dir, freq, methods, alpha, **params)
+
+
+def scan_articles(
+    articles: list,
+    data_dir,
+    freq: str = "D",
+    methods: tuple = ("kleinberg", "pelt"),
+    alpha: float = 0.01,
+    workers: int = None,
+    **params,
+) -> pd.DataFrame:
+    """Detect events for many articles in parallel; one row per event."""
+    arguments = [(article, data_dir, freq, methods, alpha, params) for article in articles]
+    events = [e for found in profiling.map_in_workers(_scan_one, arguments, workers) for e in found]
+    columns = list(Event.__dataclass_fields__)
+    return pd.DataFrame([event.as_dict() for event in events], columns=columns)
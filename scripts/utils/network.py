@@ -0,0 +1,293 @@
+import os
+import re
+import csv
+import glob
+import pandas as pd
+from datetime import datetime, timedelta
+from lxml import etree
+
+from . import profiling
+
+# Helper functions to transform the revision XMLs into a Gephi-ready schema.
+# Used by network_preprocessing.ipynb.
+
+node_index = {"Taylor_Swift": 1, "Kanye_West": 2}
+node_id_counter = 3
+edge_id_counter = 1
+
+INTERNAL_LINK_PATTERN = re.compile(r"\[\[([^\]|]+)(?:\|([^\]]+))?\]\]")
+EXTERNAL_LINK_PATTERN = re.compile(
+    r"\{\{(cite\s\w+)\s.*?url\s*=\s*([^|]+).*?title\s*=\s*([^|]+)"
+)
+
+
+def load_existing_data(nodes_file, edges_file):
+    global node_index, node_id_counter, edge_id_counter
+    if os.path.exists(nodes_file):
+        with open(nodes_file, mode="r", encoding="utf-8") as nodes_f:
+            reader = csv.DictReader(nodes_f)
+            for row in reader:
+                node_id = int(row["nodeId"])
+                node_index[row["name"]] = node_id
+                node_id_counter = max(node_id_counter, node_id + 1)
+
+    if os.path.exists(edges_file):
+        with open(edges_file, mode="r", encoding="utf-8") as edges_f:
+            reader = csv.DictReader(edges_f)
+            for row in reader:
+                edge_id = int(row["edgeId"])
+                edge_id_counter = max(edge_id_counter, edge_id + 1)
+
+
+def parse_revision(revision, article_name):
+    # metadata
+    rev_id = revision.find("id").text if revision.find("id") is not None else None
+    parent_id = (
+        revision.find("parentid").text if revision.find("parentid") is not None else None
+    )
+    timestamp_str = (
+        revision.find("timestamp").text if revision.find("timestamp") is not None else None
+    )
+    timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "")) if timestamp_str else None
+    year, month, day = (
+        (timestamp.year, timestamp.month, timestamp.day) if timestamp else (None, None, None)
+    )
+
+    text = revision.find("text").text if revision.find("text") is not None else ""
+    if text:
+        links = []
+
+        # Process internal links
+        for match in INTERNAL_LINK_PATTERN.finditer(text):
+            link = "https://en.wikipedia.org/wiki/" + match.group(1).replace(" ", "_")
+            title = match.group(2) if match.group(2) else match.group(1)
+            link_type = "internal"
+            links.append((link.strip(), title.strip(), link_type))
+
+        # Process external links
+        for match in EXTERNAL_LINK_PATTERN.finditer(text):
+            link_type = match.group(1).strip()  # Get type after "cite"
+            link = match.group(2).strip()
+            title = match.group(3).strip()
+            links.append((link, title, link_type))
+        return [
+            {
+                "revId": rev_id,
+                "ParentId": parent_id,
+                "ArticleName": article_name,
+                "TimeStamp": timestamp,
+                "Year": year,
+                "Month": month,
+                "Day": day,
+                "Link": link,
+                "LinkTitle": title,
+                "LinkType": link_type,
+            }
+            for link, title, link_type in links
+        ]
+    else:
+        return []
+
+
+def crawl_all_xml_files(
+    root_folder,
+    article_name,
+    nodes_file="node.csv",
+    edges_file="edge.csv",
+    nodeEdge_file="nodeEdge.csv",
+):
+    global node_index, node_id_counter, edge_id_counter
+    folder = os.path.join(root_folder, article_name)
+    print("Crawling folder:", folder)
+    curr = "Taylor_Swift" if "aylor" in folder else "Kanye_West"
+
+    # Open node, edge, and nodeEdge files for appending
+    with profiling.stage("crawl_links", article=article_name) as stage, open(
+        nodes_file, mode="a", newline="", encoding="utf-8"
+    ) as nodes_f, open(edges_file, mode="a", newline="", encoding="utf-8") as edges_f, open(
+        nodeEdge_file, mode="a", newline="", encoding="utf-8"
+    ) as nodeEdges_f:
+
+        node_writer = csv.DictWriter(nodes_f, fieldnames=["nodeId", "name"])
+        edge_writer = csv.DictWriter(
+            edges_f,
+            fieldnames=["edgeId", "revId", "TimeStamp", "from", "to", "Year", "Month", "Day", "LinkType"],
+        )
+        nodeEdge_writer = csv.DictWriter(
+            nodeEdges_f,
+            fieldnames=[
+                "edgeId", "revId", "ParentId", "ArticleName", "TimeStamp",
+                "Year", "Month", "Day", "Link", "LinkTitle", "LinkType",
+            ],
+        )
+
+        # the files may already hold earlier articles; only count what this call appends
+        start_positions = [f.tell() for f in (nodes_f, edges_f, nodeEdges_f)]
+
+        if nodes_f.tell() == 0:
+            node_writer.writeheader()
+            node_writer.writerow({"nodeId": 1, "name": "Taylor_Swift"})
+            node_writer.writerow({"nodeId": 2, "name": "Kanye_West"})
+        if edges_f.tell() == 0:
+            edge_writer.writeheader()
+        if nodeEdges_f.tell() == 0:
+            nodeEdge_writer.writeheader()
+
+        pattern = os.path.join(folder, "**", "*.xml")
+        xml_files = glob.glob(pattern, recursive=True)
+        print("Found XML files:", len(xml_files))
+
+        for xml_file in xml_files:
+            if profiling.is_enabled():
+                stage.add("files")
+                stage.add("bytes_read", os.path.getsize(xml_file))
+            try:
+                for event, elem in etree.iterparse(xml_file, tag="revision", events=("end",)):
+                    link_data = parse_revision(elem, article_name)
+                    stage.add("revisions")
+                    stage.add("links", len(link_data))
+
+                    for data in link_data:
+                        source_name = curr
+                        target_name = data["LinkTitle"]
+                        if source_name not in node_index:
+                            node_index[source_name] = node_id_counter
+                            node_writer.writerow({"nodeId": node_index[source_name], "name": source_name})
+                            node_id_counter += 1
+
+                        if target_name not in node_index:
+                            node_index[target_name] = node_id_counter
+                            node_writer.writerow({"nodeId": node_index[target_name], "name": target_name})
+                            node_id_counter += 1
+
+                        edge_writer.writerow({
+                            "edgeId": edge_id_counter,
+                            "TimeStamp": data["TimeStamp"],
+                            "revId": data["revId"],
+                            "from": node_index[source_name],
+                            "to": node_index[target_name],
+                            "Year": data["Year"],
+                            "Month": data["Month"],
+                            "Day": data["Day"],
+                            "LinkType": data["LinkType"],
+                        })
+
+                        nodeEdge_writer.writerow({
+                            "edgeId": edge_id_counter,
+                            "revId": data["revId"],
+                            "ParentId": data["ParentId"],
+                            "ArticleName": data["ArticleName"],
+                            "TimeStamp": data["TimeStamp"],
+                            "Year": data["Year"],
+                            "Month": data["Month"],
+                            "Day": data["Day"],
+                            "Link": data["Link"],
+                            "LinkTitle": data["LinkTitle"],
+                            "LinkType": data["LinkType"],
+                        })
+                        edge_id_counter += 1
+
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+            except Exception as e:
+                print(f"Error processing {xml_file}: {e}")
+
+        if profiling.is_enabled():
+            for f, start in zip((nodes_f, edges_f, nodeEdges_f), start_positions):
+                f.flush()
+                stage.add("bytes_written", f.tell() - start)
+
+
+@profiling.profiled()
+def filter_and_aggregate_edges(edges_file, filterOffsetDate, output_dir="."):
+    cutoff_date = datetime.strptime(filterOffsetDate, "%Y-%m-%d")
+    df = pd.read_csv(edges_file)
+
+    df["TimeStamp"] = pd.to_datetime(df["TimeStamp"])
+    filtered_df = df[df["TimeStamp"] <= cutoff_date]
+
+    aggregated_df = filtered_df.groupby(["source", "target"], as_index=False).agg({
+        "edgeId": "first",
+        "revId": "count",
+        "Year": "first",
+        "Month": "first",
+        "Day": "first",
+        "LinkType": "first",
+    })
+
+    aggregated_df.rename(columns={"revId": "weight"}, inplace=True)
+
+    output_file = os.path.join(output_dir, f"TK_Edge_{filterOffsetDate}.csv")
+    aggregated_df.to_csv(output_file, index=False)
+    print(f"Aggregated edges saved to {output_file}")
+
+
+@profiling.profiled()
+def filter_newly_connected_nodes(edges_file, filterOffsetDate, output_dir="."):
+    cutoff_date = datetime.strptime(filterOffsetDate, "%Y-%m-%d")
+    df = pd.read_csv(edges_file)
+    df["TimeStamp"] = pd.to_datetime(df["TimeStamp"])
+
+    taylor_id = 1
+    kanye_id = 2
+
+    df = df.sort_values(by="TimeStamp")
+    first_appearance_df = df.groupby(["source", "target"], as_index=False).first()
+    filtered_df = first_appearance_df[first_appearance_df["TimeStamp"] > cutoff_date]
+    relevant_nodes = filtered_df.groupby("target").filter(
+        lambda x: {taylor_id, kanye_id}.issubset(x["source"].values)
+    )
+    relevant_edges = df[df["target"].isin(relevant_nodes["target"]) & (df["TimeStamp"] > cutoff_date)]
+    aggregated_edges = relevant_edges.groupby(["source", "target"], as_index=False).agg({
+        "TimeStamp": "first",
+        "Year": "first",
+        "Month": "first",
+        "edgeId": "first",
+        "LinkType": "first",
+        "revId": "count",
+    }).rename(columns={"revId": "weight", "year": "first_appeared_in_year", "month": "first_appeared_in_month"})
+
+    output_file = os.path.join(output_dir, f"TK_NewlyConnectedNodes_{filterOffsetDate}.csv")
+    aggregated_edges.to_csv(output_file, index=False)
+    print(f"Filtered and aggregated edges saved to {output_file}")
+
+
+@profiling.profiled()
+def generate_edge_csvs(edges_file, cutoff_date, day_range, id_to_label, output_dir="."):
+    cutoff_datetime = datetime.strptime(cutoff_date, "%Y-%m-%d")
+    range_end_date = cutoff_datetime + timedelta(days=day_range)
+    df = pd.read_csv(edges_file)
+    df["TimeStamp"] = pd.to_datetime(df["TimeStamp"])
+    df["target_name"] = df["target"].map(id_to_label)
+
+    edges_before_cutoff = df[df["TimeStamp"] < cutoff_datetime]
+    unique_edges_before = edges_before_cutoff.groupby(["source", "target", "target_name"], as_index=False).agg({
+        "TimeStamp": "first",
+        "edgeId": "first",
+        "LinkType": "first",
+        "revId": "count",
+    }).rename(columns={"revId": "weight"})
+
+    # Save unique edges before the cutoff date to CSV
+    output_file_before = os.path.join(output_dir, f"UniqueEdgesBefore_{cutoff_date}.csv")
+    unique_edges_before.to_csv(output_file_before, index=False)
+    print(f"Unique edges before {cutoff_date} saved to {output_file_before}")
+    existing_edges = set(zip(unique_edges_before["source"], unique_edges_before["target"]))
+    edges_after_cutoff = df[(df["TimeStamp"] >= cutoff_datetime) & (df["TimeStamp"] <= range_end_date)]
+
+    # Exclude any edge that appeared in the prior dataset
+    new_edges_in_range = edges_after_cutoff[
+        ~edges_after_cutoff[["source", "target"]].apply(tuple, axis=1).isin(existing_edges)
+    ]
+    aggregated_new_edges = new_edges_in_range.groupby(["source", "target", "target_name"], as_index=False).agg({
+        "TimeStamp": "first",
+        "edgeId": "first",
+        "LinkType": "first",
+        "revId": "count",
+    }).rename(columns={"revId": "weight"})
+
+    # Save new edges within the specified day range to CSV
+    output_file_after = os.path.join(output_dir, f"NewEdgesWithinRange_{cutoff_date}_Range_{day_range}.csv")
+    aggregated_new_edges.to_csv(output_file_after, index=False)
+    print(f"New edges within {day_range} days after {cutoff_date} saved to {output_file_after}")
@@ -1,30 +1,132 @@
-from plotly import express as px
+import base64
+import functools
+import io
 import pandas as pd
 from datetime import datetime
-from wordcloud import WordCloud
-from PIL import Image
 import numpy as np
 from plotly import graph_objects as go
 import os
 
+from . import profiling
 
-def plot_timeseries(data, x, y, title, x_title, y_title, file_path):
-    if data[x].map(lambda x: isinstance(x, datetime)).all():
-        data.set_index(x, inplace=True)
-        data = data.resample("ME").count()
-        data = data.reset_index()
-        fig = px.line(data, x=x, y=y, title=title)
+# Longer series are downsampled before plotting (see downsample_minmax)
+MAX_POINTS = 4000
+
+
+def resample_counts(data, x, rule="ME"):
+    """Count the rows of ``data`` per ``rule`` period of the datetime column ``x``."""
+    return data.set_index(x).resample(rule).count().reset_index()
+
+
+def is_datetime(values):
+    return pd.api.types.is_datetime64_any_dtype(values) or values.map(lambda v: isinstance(v, datetime)).all()
+
+
+def downsample_minmax(data, y, max_points=MAX_POINTS):
+    """
+    Keep at most ``max_points`` rows of ``data`` (ordered by x): the first and
+    last row, plus the rows with the lowest and highest ``y`` in each of
+    ``(max_points - 2) / 2`` equal buckets, so spikes survive the downsampling.
+    """
+    n = len(data)
+    if max_points is None or n <= max_points:
+        return data
+    buckets = (max_points - 2) // 2
+    if buckets < 1:
+        return data.iloc[[0, n - 1][:max_points]]
+    bucket = np.arange(n) * buckets // n
+    order = np.lexsort((data[y].to_numpy(), bucket))
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    keep = np.unique(np.concatenate((order[starts], order[ends], [0, n - 1])))
+    return data.iloc[keep]
+
+
+def write_figure(fig, file_path, include_plotlyjs=True):
+    """
+    Write ``fig`` as HTML or, for a .png path, as an image (needs kaleido).
+    With ``include_plotlyjs="directory"`` the HTML references a shared
+    plotly-<version>.min.js next to it (see ``write_plotlyjs``) instead of
+    embedding 3 MB of JavaScript.
+    """
+    if str(file_path).endswith(".png"):
+        fig.write_image(file_path)
+    else:
+        if include_plotlyjs == "directory":
+            include_plotlyjs = plotlyjs_name()
+        fig.write_html(file_path, include_plotlyjs=include_plotlyjs)
+
+
+def plotlyjs_name():
+    """File name of the shared plotly.js, versioned so that upgrading plotly writes a new one."""
+    from plotly.offline import get_plotlyjs_version
+
+    return f"plotly-{get_plotlyjs_version()}.min.js"
+
+
+def write_plotlyjs(directory):
+    """Put the plotly.js used by include_plotlyjs="directory" into ``directory``."""
+    from plotly.offline import get_plotlyjs
+
+    path = os.path.join(directory, plotlyjs_name())
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+        os.replace(tmp, path)
+    return path
+
+
+@functools.lru_cache(maxsize=32)
+def _encode_image(file_path, mtime_ns, size, max_width):
+    from PIL import Image
+
+    with Image.open(file_path) as img:
+        img = img.convert("RGB")
+        if max_width and img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)))
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=70, optimize=True)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def encoded_image(file_path, max_width=1200):
+    """
+    ``file_path`` as a data URI for layout images: scaled down to
+    ``max_width`` pixels and stored as JPEG, which is plenty for a faded
+    background and a fraction of the PNG size. Cached per process until the
+    file changes.
+    """
+    stat = os.stat(file_path)
+    return _encode_image(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, max_width)
+
+
+@profiling.profiled()
+def plot_timeseries(
+    data, x, y, title, x_title, y_title, file_path, show=True, rule="ME", max_points=MAX_POINTS, include_plotlyjs=True
+):
+    if is_datetime(data[x]):
+        if rule is not None:
+            data = resample_counts(data, x, rule)
+        data = downsample_minmax(data, y, max_points)
+        fig = go.Figure(go.Scattergl(x=data[x], y=data[y], mode="lines"))
+        fig.update_layout(title=title, template="plotly")
         fig.update_xaxes(title_text=x_title)
         fig.update_yaxes(title_text=y_title)
-        fig.show()
-        fig.write_html(file_path)
+        if show:
+            fig.show()
+        if file_path:
+            write_figure(fig, file_path, include_plotlyjs)
+        return fig
     else:
         print("Error: x-axis must be a datetime object")
 
 
-def plot_wordcloud(text, file_path):
-    # create wordcloud
-    wordcloud = WordCloud(
+def _wordcloud():
+    from wordcloud import WordCloud
+
+    return WordCloud(
         width=1500,
         height=600,
         background_color="white",
@@ -32,13 +134,70 @@ def plot_wordcloud(text, file_path):
         contour_width=1,
         contour_color="brown",
         random_state=2,
-    ).generate(text)
+    )
+
+
+@profiling.profiled()
+def plot_wordcloud(text, file_path):
+    # create wordcloud
+    wordcloud = _wordcloud().generate(text)
     # save & load
     wordcloud.to_file(file_path)
 
 
+@profiling.profiled()
+def plot_wordcloud_frequencies(frequencies, file_path):
+    """Word cloud from a term -> count mapping, e.g. ``utils.terms.frequencies``."""
+    if not frequencies:
+        print("Error: no terms to draw")
+        return
+    _wordcloud().generate_from_frequencies(frequencies).to_file(file_path)
+
+
+@profiling.profiled()
+def plot_top_terms(data, title, x_title="Count", value="count", file_path=None, show=True, include_plotlyjs=True):
+    """Horizontal bars of ``data[value]`` per ``data["term"]``, largest on top."""
+    fig = go.Figure(
+        go.Bar(
+            x=data[value],
+            y=data["term"],
+            orientation="h",
+            marker_color="#8c564b",
+            text=data["count"],
+            textposition="auto",
+        )
+    )
+    fig.update_layout(
+        title={"text": title, "x": 0.5, "xanchor": "center"},
+        xaxis_title=x_title,
+        yaxis={"autorange": "reversed"},
+        template="plotly_white",
+        height=max(400, 25 * len(data) + 150),
+        font_family="Raleway",
+        font_color="#5D4037",
+    )
+    if show:
+        fig.show()
+    if file_path:
+        write_figure(fig, file_path, include_plotlyjs)
+    return fig
+
+
+@profiling.profiled()
 def plot_timeseries_with_annotations(
-    data, x, y, title, x_title, y_title, annotations, wordcloud_file_path=None
+    data,
+    x,
+    y,
+    title,
+    x_title,
+    y_title,
+    annotations,
+    wordcloud_file_path=None,
+    file_path=None,
+    show=True,
+    rule="ME",
+    max_points=MAX_POINTS,
+    include_plotlyjs=True,
 ):
 
     # Ensure data has the correct index and is reset
@@ -49,10 +208,9 @@ def plot_timeseries_with_annotations(
 
     # Add word cloud image as a background if the file exists
     if wordcloud_file_path and os.path.exists(wordcloud_file_path):
-        img = Image.open(wordcloud_file_path)
         fig.add_layout_image(
             dict(
-                source=img,
+                source=encoded_image(wordcloud_file_path),
                 xref="paper",
                 yref="paper",
                 x=0,
@@ -65,13 +223,12 @@ def plot_timeseries_with_annotations(
                 layer="below",
             )
         )
-    if data[x].map(lambda x: isinstance(x, datetime)).all():
-        data.set_index(x, inplace=True)
-        data = data.resample("ME").count()
-        data = data.reset_index()
+    if rule is not None and is_datetime(data[x]):
+        data = resample_counts(data, x, rule)
+    data = downsample_minmax(data, y, max_points)
     # Add line trace
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=data[x],
             y=data[y],
             mode="lines",
@@ -82,7 +239,7 @@ def plot_timeseries_with_annotations(
 
     # Add scatter trace for data points with colorscale applied
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=data[x],
             y=data[y],
             mode="markers",
@@ -126,7 +283,11 @@ def plot_timeseries_with_annotations(
     fig.update_layout(showlegend=False)
 
     # Display the figure
-    fig.show()
+    if show:
+        fig.show()
+    if file_path:
+        write_figure(fig, file_path, include_plotlyjs)
+    return fig
 
 
 def calculate_percent_change(before, after):
@@ -135,6 +296,7 @@ def calculate_percent_change(before, after):
     return f"+{((after - before) / before * 100):.0f}%"
 
 
+@profiling.profiled()
 def create_bar_plot(
     df, categories, series, colors, title, yaxis_title, percent_change_base=None
 ):
@@ -0,0 +1,396 @@
+"""
+Lightweight instrumentation shared by the scraper, converter, network and
+plotting stages.
+
+Profiling is off by default. Turn it on with the ``--profile`` flag of the
+command line scripts, by calling ``enable()`` from a notebook, or by exporting
+``WIKI_PROFILE=1``. While it is off, ``stage`` hands back a shared no-op object
+and ``add`` returns straight away, so the hooks can stay in hot loops.
+
+Each stage records wall time, CPU time, peak RSS and any counters added while
+it was open (bytes downloaded/read/written, revisions, files, links...). The
+report is written as JSON and CSV to ``WIKI_PROFILE_DIR`` (default
+``output/profiling``). Set ``WIKI_PROFILER=cprofile`` or ``pyinstrument`` to
+additionally capture a profile of every top-level stage.
+
+``map_in_workers`` runs a function over many articles in a process pool and
+merges the records of the workers into the report of the parent process.
+"""
+
+import atexit
+import csv
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ENV_FLAG = "WIKI_PROFILE"
+ENV_DIR = "WIKI_PROFILE_DIR"
+ENV_PROFILER = "WIKI_PROFILER"
+
+DEFAULT_REPORT_DIR = Path(__file__).resolve().parents[2] / "output" / "profiling"
+PROFILERS = ("none", "cprofile", "pyinstrument")
+
+_ENABLED = os.environ.get(ENV_FLAG, "").lower() in ("1", "true", "yes", "on")
+_RECORDS = []
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+_ATEXIT_REGISTERED = False
+
+
+class _NullStage:
+    """Stand-in returned by ``stage`` while profiling is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, counter: str, value: float = 1) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageRecord:
+    """Timing, memory and counters of one execution of a named stage."""
+
+    def __init__(self, name: str, meta: dict):
+        self.name = name
+        self.meta = meta
+        self.counters = {}
+        self.started_at = None
+        self.wall_s = None
+        self.cpu_s = None
+        self.peak_rss_mb = None
+        self.pid = os.getpid()
+        self.parent = None
+        self.profile_path = None
+        self._profiler = None
+
+    def add(self, counter: str, value: float = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].name if stack else None
+        if not stack:
+            self._profiler = _start_profiler()
+        stack.append(self)
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._wall0
+        self.cpu_s = time.process_time() - self._cpu0
+        self.peak_rss_mb = peak_rss_mb()
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if self._profiler is not None:
+            self.profile_path = _stop_profiler(self._profiler, self.name)
+            self._profiler = None
+        with _LOCK:
+            _RECORDS.append(self.as_dict())
+        return False
+
+    def as_dict(self) -> dict:
+        rates = {}
+        if self.wall_s:
+            rates = {
+                f"{counter}_per_s": value / self.wall_s
+                for counter, value in self.counters.items()
+            }
+        return {
+            "stage": self.name,
+            "parent": self.parent,
+            "pid": self.pid,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "peak_rss_mb": self.peak_rss_mb,
+            "meta": self.meta,
+            "counters": dict(self.counters),
+            "rates": rates,
+            "profile_path": self.profile_path,
+        }
+
+
+def _stack() -> list:
+    if not hasattr(_LOCAL, "stack"):
+        _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def enable(report_dir: Path = None, profiler: str = None) -> None:
+    """
+    Switch profiling on for this process and any worker processes it starts.
+    The report is written automatically when the interpreter exits.
+    """
+    global _ENABLED
+    _ENABLED = True
+    os.environ[ENV_FLAG] = "1"
+    if report_dir is not None:
+        os.environ[ENV_DIR] = str(report_dir)
+    if profiler is not None:
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profiler}, expected one of {PROFILERS}")
+        os.environ[ENV_PROFILER] = profiler
+    _register_atexit()
+
+
+def disable() -> None:
+    global _ENABLED
+    _ENABLED = False
+    os.environ.pop(ENV_FLAG, None)
+
+
+def stage(name: str, **meta):
+    """
+    Context manager timing the enclosed block as stage ``name``. Keyword
+    arguments (article name, batch size...) are stored with the record.
+
+        with profiling.stage("convert", article="Taylor_Swift") as s:
+            ...
+            s.add("revisions", len(batch))
+    """
+    if not _ENABLED:
+        return _NULL_STAGE
+    return StageRecord(name, meta)
+
+
+def add(counter: str, value: float = 1) -> None:
+    """Add ``value`` to ``counter`` on the innermost open stage, if any."""
+    if not _ENABLED:
+        return
+    stack = _stack()
+    if stack:
+        stack[-1].add(counter, value)
+
+
+def profiled(name: str = None):
+    """Decorator running the wrapped function inside ``stage(name)``."""
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            with StageRecord(stage_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB, if available."""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS reports bytes
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return peak / divisor
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def collect(clear: bool = True) -> list:
+    """
+    Return the records gathered so far in this process. Worker processes
+    return this list to the parent, which passes it to ``merge``.
+    """
+    with _LOCK:
+        records = list(_RECORDS)
+        if clear:
+            _RECORDS.clear()
+    return records
+
+
+def merge(records: list) -> None:
+    """Add records collected in another (worker) process to this report."""
+    if not _ENABLED or not records:
+        return
+    with _LOCK:
+        _RECORDS.extend(records)
+
+
+def reset() -> None:
+    with _LOCK:
+        _RECORDS.clear()
+
+
+def default_workers() -> int:
+    return min(4, os.cpu_count() or 1)
+
+
+def _in_worker(func, *args):
+    """Run ``func`` in a worker and ship its profiling records back."""
+    reset()  # drop records inherited from a forked parent
+    return func(*args), collect()
+
+
+def map_in_workers(func, argument_lists: list, workers: int = None) -> list:
+    """
+    ``func(*args)`` for every tuple in ``argument_lists``, in order. With more
+    than one worker (default ``default_workers()``) and more than one task the
+    calls run in a process pool, so ``func`` must be a module-level function.
+    """
+    argument_lists = list(argument_lists)
+    workers = workers or default_workers()
+    if workers <= 1 or len(argument_lists) <= 1:
+        return [func(*args) for args in argument_lists]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(argument_lists))) as pool:
+        futures = [pool.submit(_in_worker, func, *args) for args in argument_lists]
+        for future in futures:
+            result, records = future.result()
+            merge(records)
+            results.append(result)
+    return results
+
+
+def summarize(records: list) -> dict:
+    """Aggregate records per stage and per worker process."""
+    stages = {}
+    workers = {}
+    for record in records:
+        for key, group in ((record["stage"], stages), (record["pid"], workers)):
+            entry = group.setdefault(
+                key, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": 0.0, "counters": {}}
+            )
+            entry["calls"] += 1
+            # nested stages are already part of their parent's time on a worker
+            if group is stages or record["parent"] is None:
+                entry["wall_s"] += record["wall_s"] or 0.0
+                entry["cpu_s"] += record["cpu_s"] or 0.0
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], record["peak_rss_mb"] or 0.0)
+            for counter, value in record["counters"].items():
+                entry["counters"][counter] = entry["counters"].get(counter, 0) + value
+    for entry in stages.values():
+        if entry["wall_s"]:
+            entry["rates"] = {
+                f"{counter}_per_s": value / entry["wall_s"]
+                for counter, value in entry["counters"].items()
+            }
+    return {"stages": stages, "workers": {str(pid): entry for pid, entry in workers.items()}}
+
+
+_FILE_NUMBERS = itertools.count(1)
+
+
+def _file_stem(prefix: str) -> str:
+    # the per-process number keeps files written within the same second apart
+    return f"{prefix}_{datetime.now():%Y%m%dT%H%M%S}_{os.getpid()}_{next(_FILE_NUMBERS)}"
+
+
+def write_report(report_dir: Path = None) -> Path:
+    """
+    Write the collected records as ``profile_<time>_<pid>_<n>.json`` (records plus
+    per-stage and per-worker summaries) and a flat ``.csv`` next to it.
+    Returns the JSON path, or None when nothing was recorded.
+    """
+    records = collect(clear=False)
+    if not records:
+        return None
+    report_dir = Path(report_dir or os.environ.get(ENV_DIR) or DEFAULT_REPORT_DIR)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    stem = _file_stem("profile")
+
+    json_path = report_dir / f"{stem}.json"
+    report = {"created_at": datetime.now().isoformat(timespec="seconds"), "records": records}
+    report.update(summarize(records))
+    json_path.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+
+    counters = sorted({counter for record in records for counter in record["counters"]})
+    fieldnames = ["stage", "parent", "pid", "started_at", "wall_s", "cpu_s", "peak_rss_mb"]
+    with open(report_dir / f"{stem}.csv", mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames + ["meta"] + counters)
+        writer.writeheader()
+        for record in records:
+            row = {key: record[key] for key in fieldnames}
+            row["meta"] = json.dumps(record["meta"], default=str)
+            row.update(record["counters"])
+            writer.writerow(row)
+
+    print(f"Profiling report saved to {json_path}")
+    return json_path
+
+
+def _register_atexit() -> None:
+    global _ATEXIT_REGISTERED
+    if not _ATEXIT_REGISTERED:
+        atexit.register(_write_report_at_exit)
+        _ATEXIT_REGISTERED = True
+
+
+def _write_report_at_exit() -> None:
+    if _ENABLED:
+        write_report()
+
+
+def _start_profiler():
+    kind = os.environ.get(ENV_PROFILER, "none").lower()
+    if kind == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return ("cprofile", profiler)
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed, skipping stage profile")
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return ("pyinstrument", profiler)
+    return None
+
+
+def _stop_profiler(handle, stage_name: str) -> str:
+    kind, profiler = handle
+    report_dir = Path(os.environ.get(ENV_DIR) or DEFAULT_REPORT_DIR)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    stem = _file_stem(stage_name)
+    if kind == "cprofile":
+        profiler.disable()
+        path = report_dir / f"{stem}.prof"
+        profiler.dump_stats(path)
+    else:
+        profiler.stop()
+        path = report_dir / f"{stem}.html"
+        path.write_text(profiler.output_html(), encoding="utf-8")
+    return str(path)
+
+
+if _ENABLED:
+    _register_atexit()
@@ -0,0 +1,267 @@
+"""
+SQL over the revision and edge files of the whole corpus, without loading them.
+
+An in-process DuckDB connection sees the files under ``data_dir`` as views:
+    revisions  DataFrames/<article>.feather (or .parquet) with an article column
+    edges      network/edge.parquet if it is newer than network/edge.csv, else edge.csv
+    nodes      network/node.csv
+Queries only read the columns they use, filters on article and time are pushed
+into the scans, the work runs on all cores and spills to ``temp_directory``
+beyond ``memory_limit``, so the corpus does not have to fit in memory.
+Results come back as pandas, Arrow or a lazy DuckDB relation that can be
+written to CSV/Parquet without materializing it.
+
+    with Corpus("data", memory_limit="4GB") as corpus:
+        corpus.edits_per_window("week", start="2016-01-01")
+        corpus.sql("SELECT article, count(*) AS edits FROM revisions GROUP BY article")
+
+Needs ``duckdb`` (``pip install -e .[query]``).
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from . import profiling
+
+WINDOWS = ("hour", "day", "week", "month", "quarter", "year")
+OUTPUTS = ("pandas", "arrow", "relation")
+EDGE_TYPES = {
+    "edgeId": "BIGINT",
+    "revId": "VARCHAR",
+    "TimeStamp": "TIMESTAMP",
+    "source": "BIGINT",
+    "target": "BIGINT",
+    "Year": "INTEGER",
+    "Month": "INTEGER",
+    "Day": "INTEGER",
+    "LinkType": "VARCHAR",
+}
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("The query layer needs duckdb: pip install duckdb (or pip install -e .[query])") from None
+    return duckdb
+
+
+def _quote(value) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _timestamp(value, utc: bool = True) -> str:
+    # filters are inlined as literals rather than bound as parameters so that
+    # DuckDB can push them into the scans; pd.Timestamp validates the value
+    stamp = pd.Timestamp(value)
+    if utc:
+        stamp = stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+        return f"TIMESTAMPTZ {_quote(stamp.isoformat())}"
+    stamp = stamp.tz_convert(None) if stamp.tzinfo is not None else stamp
+    return f"TIMESTAMP {_quote(stamp.isoformat())}"
+
+
+def _conditions(articles=None, start=None, end=None, column="timestamp", utc=True) -> list:
+    conditions = []
+    if articles:
+        conditions.append(f"article IN ({', '.join(_quote(article) for article in articles)})")
+    if start is not None:
+        conditions.append(f"{column} >= {_timestamp(start, utc)}")
+    if end is not None:
+        conditions.append(f"{column} <= {_timestamp(end, utc)}")
+    return conditions
+
+
+def _where(conditions: list) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def _edge_csv(network: Path) -> str:
+    types = ", ".join(f"{_quote(name)}: {_quote(kind)}" for name, kind in EDGE_TYPES.items())
+    return f"read_csv({_quote(network / 'edge.csv')}, header = true, columns = {{{types}}})"
+
+
+def _edge_source(network: Path) -> str:
+    csv_path, parquet_path = network / "edge.csv", network / "edge.parquet"
+    if parquet_path.exists() and (not csv_path.exists() or parquet_path.stat().st_mtime >= csv_path.stat().st_mtime):
+        return f"read_parquet({_quote(parquet_path)})"
+    return _edge_csv(network)
+
+
+class Corpus:
+    """DuckDB views over the revision tables and network files of ``data_dir``."""
+
+    def __init__(self, data_dir, articles: list = None, threads: int = None, memory_limit: str = None, temp_directory=None):
+        duckdb = _duckdb()
+        self.data_dir = Path(data_dir)
+        config = {"threads": threads, "memory_limit": memory_limit, "temp_directory": str(temp_directory) if temp_directory else None}
+        self.connection = duckdb.connect(config={name: value for name, value in config.items() if value is not None})
+        self.connection.execute("SET TimeZone = 'UTC'")
+        self.views = set()
+        self.articles = self._register_revisions(articles)
+        self._register_network()
+
+    def _register_revisions(self, articles: list = None) -> list:
+        import pyarrow.dataset as ds
+
+        tables = {}
+        for path in sorted((self.data_dir / "DataFrames").glob("*")):
+            if path.suffix in (".feather", ".parquet") and (articles is None or path.stem in articles):
+                # a Parquet copy of the same article wins over its Feather file
+                if path.suffix == ".parquet" or path.stem not in tables:
+                    tables[path.stem] = path
+        branches = []
+        for i, (article, path) in enumerate(tables.items()):
+            if path.suffix == ".parquet":
+                source = f"read_parquet({_quote(path)})"
+            else:
+                # DuckDB scans Arrow datasets lazily, with projection and filter pushdown
+                name = f"_revisions_{i}"
+                self.connection.register(name, ds.dataset(path, format="feather"))
+                source = name
+            branches.append(f"SELECT {_quote(article)} AS article, * FROM {source}")
+        if branches:
+            self.connection.execute(f"CREATE VIEW revisions AS {' UNION ALL BY NAME '.join(branches)}")
+            self.views.add("revisions")
+        return list(tables)
+
+    def _register_network(self) -> None:
+        network = self.data_dir / "network"
+        if (network / "edge.csv").exists() or (network / "edge.parquet").exists():
+            self.connection.execute(f"CREATE VIEW edges AS SELECT * FROM {_edge_source(network)}")
+            self.views.add("edges")
+        if (network / "node.csv").exists():
+            self.connection.execute(
+                f"CREATE VIEW nodes AS SELECT * FROM read_csv({_quote(network / 'node.csv')}, header = true, "
+                "columns = {'Id': 'BIGINT', 'Label': 'VARCHAR'})"
+            )
+            self.views.add("nodes")
+
+    def _require(self, view: str) -> None:
+        if view not in self.views:
+            hint = "wikianalysis convert" if view == "revisions" else "wikianalysis links"
+            raise FileNotFoundError(f"No {view} files in {self.data_dir}, run: {hint}")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def sql(self, query: str, params: list = None, output: str = "pandas"):
+        """Run any query over the ``revisions``, ``edges`` and ``nodes`` views."""
+        if output not in OUTPUTS:
+            raise ValueError(f"output must be one of {OUTPUTS}, not {output!r}")
+        relation = self.connection.sql(query, params=params)
+        if output == "relation":
+            return relation
+        with profiling.stage("query") as stage:
+            result = relation.df() if output == "pandas" else relation.fetch_arrow_table()
+            stage.add("rows", len(result))
+        return result
+
+    def edits_per_window(self, window: str = "month", articles: list = None, start=None, end=None, output: str = "pandas"):
+        """Edits and distinct editors per article and ``window`` (hour, day, week, month, quarter, year)."""
+        if window not in WINDOWS:
+            raise ValueError(f"window must be one of {WINDOWS}, not {window!r}")
+        self._require("revisions")
+        return self.sql(
+            f"""
+            SELECT article, date_trunc({_quote(window)}, timestamp) AS period,
+                   count(*) AS edits, count(DISTINCT coalesce(username, userid)) AS editors
+            FROM revisions {_where(_conditions(articles, start, end))}
+            GROUP BY article, period
+            ORDER BY article, period
+            """,
+            output=output,
+        )
+
+    def editor_shares(self, articles: list = None, start=None, end=None, top: int = 10, output: str = "pandas"):
+        """The ``top`` editors of each article by edits, with their share of its edits (anonymous edits as NULL)."""
+        self._require("revisions")
+        return self.sql(
+            f"""
+            SELECT article, coalesce(username, userid) AS editor, count(*) AS edits,
+                   count(*) / sum(count(*)) OVER (PARTITION BY article) AS share,
+                   min(timestamp) AS first_edit, max(timestamp) AS last_edit
+            FROM revisions {_where(_conditions(articles, start, end))}
+            GROUP BY article, editor
+            QUALIFY row_number() OVER (PARTITION BY article ORDER BY edits DESC, editor) <= {int(top)}
+            ORDER BY article, edits DESC, editor
+            """,
+            output=output,
+        )
+
+    def edge_aggregates(self, cutoff, start=None, link_type: str = None, output: str = "pandas"):
+        """
+        One row per source/target with the links seen up to ``cutoff`` (and from
+        ``start``): the columns of ``TK_Edge_<cutoff>.csv`` from
+        ``network.filter_and_aggregate_edges`` plus the target's label.
+        """
+        self._require("edges")
+        conditions = _conditions(start=start, end=cutoff, column="TimeStamp", utc=False)
+        if link_type is not None:
+            conditions.append(f"LinkType = {_quote(link_type)}")
+        return self.sql(
+            f"""
+            SELECT e.*, n.Label AS target_name
+            FROM (
+                SELECT source, target, min(edgeId) AS edgeId, count(revId) AS weight,
+                       arg_min(Year, edgeId) AS Year, arg_min(Month, edgeId) AS Month,
+                       arg_min(Day, edgeId) AS Day, arg_min(LinkType, edgeId) AS LinkType
+                FROM edges {_where(conditions)}
+                GROUP BY source, target
+            ) e
+            LEFT JOIN {"nodes" if "nodes" in self.views else "(SELECT NULL::BIGINT AS Id, NULL AS Label)"} n ON n.Id = e.target
+            ORDER BY e.source, e.target
+            """,
+            output=output,
+        )
+
+    def new_edges(self, cutoff, days: int, output: str = "pandas"):
+        """
+        Links first made within ``days`` after ``cutoff``, aggregated per
+        source/target: ``NewEdgesWithinRange_<cutoff>_Range_<days>.csv`` of
+        ``network.generate_edge_csvs``.
+        """
+        self._require("edges")
+        end = pd.Timestamp(cutoff) + pd.Timedelta(days=days)
+        before = _timestamp(cutoff, utc=False)
+        return self.sql(
+            f"""
+            WITH existing AS (SELECT DISTINCT source, target FROM edges WHERE TimeStamp < {before})
+            SELECT source, target, arg_min(TimeStamp, edgeId) AS TimeStamp, min(edgeId) AS edgeId,
+                   arg_min(LinkType, edgeId) AS LinkType, count(revId) AS weight
+            FROM edges
+            ANTI JOIN existing USING (source, target)
+            WHERE TimeStamp >= {before} AND TimeStamp <= {_timestamp(end, utc=False)}
+            GROUP BY source, target
+            ORDER BY source, target
+            """,
+            output=output,
+        )
+
+
+def write_edge_parquet(data_dir, row_group_size: int = 100_000, **options) -> Path:
+    """
+    Copy ``network/edge.csv`` to ``network/edge.parquet`` sorted by time, so
+    cutoff filters skip whole row groups. The copy streams through DuckDB and
+    is only used while it is newer than the CSV.
+    """
+    network = Path(data_dir) / "network"
+    if not (network / "edge.csv").exists():
+        raise FileNotFoundError(f"{network / 'edge.csv'} not found, run: wikianalysis links")
+    output = network / "edge.parquet"
+    tmp = output.with_suffix(".parquet.tmp")
+    with Corpus(data_dir, articles=[], **options) as corpus, profiling.stage("edge_parquet") as stage:
+        corpus.connection.execute(
+            f"COPY (SELECT * FROM {_edge_csv(network)} ORDER BY TimeStamp, edgeId) TO {_quote(tmp)} "
+            f"(FORMAT parquet, ROW_GROUP_SIZE {int(row_group_size)})"
+        )
+        tmp.replace(output)
+        stage.add("bytes_written", output.stat().st_size)
+    return output
@@ -0,0 +1,129 @@
+"""
+Headless batch rendering of the figures of many articles.
+
+For every article a set of figures is rendered in a process pool, without
+opening a browser, and written to ``<output_dir>/reports/<article>_<figure>.html``
+(and ``.png`` with kaleido installed):
+    edits    edits per day (or --freq) with the detected bursts as annotations
+             and ``<output_dir>/<article>_wordcloud.png`` as background
+    monthly  edits per month
+    reverts  reverts per week, if ``wikianalysis reverts`` has run
+
+Long series are drawn with WebGL traces after min/max-preserving
+downsampling, and all HTML files share one plotly-<version>.min.js, so each
+file is a few hundred kB at most.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+from . import events, profiling
+from .plot_graphs import MAX_POINTS, plot_timeseries, plot_timeseries_with_annotations, write_figure, write_plotlyjs
+
+FIGURES = ("edits", "monthly", "reverts")
+
+
+def _edits(article, timestamps, data_dir, output_dir, freq, max_points):
+    counts = events.edit_counts(timestamps, freq)
+    data = pd.DataFrame({"timestamp": counts.index.start_time, "edits": counts.to_numpy()})
+    found = events.detect_events(timestamps, article, freq)
+    wordcloud = Path(output_dir) / f"{article}_wordcloud.png"
+    return plot_timeseries_with_annotations(
+        data=data,
+        x="timestamp",
+        y="edits",
+        title=f"Editing History of <b>{article.replace('_', ' ')}</b>'s Wikipedia Page",
+        x_title="Date",
+        y_title="Number of Wikipedia Page Edits",
+        annotations=events.to_annotations(found, top=5, x_format="%Y-%m-%d"),
+        wordcloud_file_path=str(wordcloud),
+        show=False,
+        rule=None,
+        max_points=max_points,
+    )
+
+
+def _monthly(article, timestamps, data_dir, output_dir, freq, max_points):
+    return plot_timeseries(
+        data=pd.DataFrame({"timestamp": timestamps, "revision_id": 1}),
+        x="timestamp",
+        y="revision_id",
+        title=f"Wikipedia Page Revisions Over Time - {article.replace('_', ' ')}",
+        x_title="Date",
+        y_title="Number of Revisions",
+        file_path=None,
+        show=False,
+        max_points=max_points,
+    )
+
+
+def _reverts(article, timestamps, data_dir, output_dir, freq, max_points):
+    path = Path(data_dir) / "reverts" / f"{article}.feather"
+    if not path.exists():
+        return None
+    flags = pd.read_feather(path, columns=["timestamp", "is_revert"])
+    return plot_timeseries(
+        data=flags.loc[flags["is_revert"], ["timestamp"]].assign(reverts=1),
+        x="timestamp",
+        y="reverts",
+        title=f"Reverts per Week - {article.replace('_', ' ')}",
+        x_title="Date",
+        y_title="Number of Reverts",
+        file_path=None,
+        show=False,
+        rule="W",
+        max_points=max_points,
+    )
+
+
+FIGURE_BUILDERS = {"edits": _edits, "monthly": _monthly, "reverts": _reverts}
+
+
+def render_article(
+    article: str,
+    data_dir,
+    output_dir,
+    figures: tuple = FIGURES,
+    formats: tuple = ("html",),
+    freq: str = "D",
+    max_points: int = MAX_POINTS,
+) -> list:
+    """Render the figures of one article and return the files written."""
+    report_dir = Path(output_dir) / "reports"
+    report_dir.mkdir(parents=True, exist_ok=True)
+    timestamps = events.load_timestamps(article, data_dir)
+    written = []
+    for name in figures:
+        with profiling.stage("report", article=article, figure=name) as stage:
+            fig = FIGURE_BUILDERS[name](article, timestamps, data_dir, output_dir, freq, max_points)
+            if fig is None:
+                continue
+            for fmt in formats:
+                path = report_dir / f"{article}_{name}.{fmt}"
+                write_figure(fig, path, include_plotlyjs="directory")
+                written.append(path)
+                if profiling.is_enabled():
+                    stage.add("bytes_written", path.stat().st_size)
+    return written
+
+
+def render_reports(
+    articles: list,
+    data_dir,
+    output_dir,
+    figures: tuple = FIGURES,
+    formats: tuple = ("html",),
+    freq: str = "D",
+    max_points: int = MAX_POINTS,
+    workers: int = None,
+) -> dict:
+    """Render the figures of many articles in parallel; returns article -> files."""
+    if "png" in formats and importlib.util.find_spec("kaleido") is None:
+        raise ImportError("PNG export needs kaleido: pip install kaleido")
+    # written once up front so the workers never race on it
+    write_plotlyjs(str(Path(output_dir) / "reports"))
+
+    arguments = [(article, data_dir, output_dir, figures, formats, freq, max_points) for article in articles]
+    return dict(zip(articles, profiling.map_in_workers(render_article, arguments, workers)))
@@ -0,0 +1,247 @@
+"""
+Identity reverts, reverted edits and edit wars from revision hashes.
+
+A revision whose sha1 matches one of the previous ``lookback`` revisions
+restores that version: it is an identity revert and the revisions in between
+are its reverted edits. One pass over the revisions with a sha1 -> last
+position map finds all of them. Only the metadata columns of the revision
+table are read, never the text.
+
+On top of the per-revision flags:
+    revert_pairs      who reverted whom, and whether the pair reverted each other
+    revert_chains     back-and-forth reverts, each reverting the previous reverter
+    edit_war_metrics  reverts, mutual reverts, chains and the controversy score
+                      of Sumi et al. (2011) per time window
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import profiling
+
+COLUMNS = ["revision_id", "timestamp", "username", "userid", "sha1", "bytes"]
+
+
+def load_revisions(article: str, data_dir) -> pd.DataFrame:
+    """Revision metadata (no text) from ``<data_dir>/DataFrames/<article>.feather``."""
+    path = Path(data_dir) / "DataFrames" / f"{article}.feather"
+    try:
+        return pd.read_feather(path, columns=COLUMNS)
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"{path} has no sha1/bytes columns, rebuild it with the current converter") from e
+
+
+def _naive(timestamps: pd.Series) -> pd.Series:
+    return timestamps.dt.tz_convert(None) if timestamps.dt.tz is not None else timestamps
+
+
+def _editors(df: pd.DataFrame) -> pd.Series:
+    """Username, or user id for renamed accounts; missing for anonymous edits."""
+    return df["username"].where(df["username"].notna(), df["userid"])
+
+
+def flag_reverts(revisions: pd.DataFrame, lookback: int = 15, max_age: str = None) -> pd.DataFrame:
+    """
+    Oldest-first copy of ``revisions`` with revert flags:
+        is_revert       restores the text of one of the previous ``lookback`` revisions
+        reverts_to      revision_id of the restored revision
+        reverted_edits  number of revisions the revert undid
+        is_reverted     undone by a later revert (the first one counts)
+        reverted_by     revision_id of that revert
+        self_reverted   undone by its own editor
+        time_to_revert  time until it was undone
+        bytes_delta     size change against the previous revision
+    ``max_age`` (e.g. "2D") additionally limits how old the restored revision may be.
+    """
+    df = revisions.copy()
+    df["_order"] = pd.to_numeric(df["revision_id"], errors="coerce")
+    df = df.sort_values(["timestamp", "_order"], kind="stable").drop(columns="_order").reset_index(drop=True)
+    df["editor"] = _editors(df)
+
+    n = len(df)
+    hashes = df["sha1"].to_numpy(dtype=object)
+    has_hash = df["sha1"].notna().to_numpy()
+    times = _naive(df["timestamp"]).to_numpy()
+    max_age = pd.Timedelta(max_age) if max_age is not None else None
+
+    restored = np.full(n, -1, dtype=np.int64)
+    undone_by = np.full(n, -1, dtype=np.int64)
+    last_position = {}
+    with profiling.stage("flag_reverts") as stage:
+        for i in range(n):
+            if not has_hash[i]:
+                continue
+            j = last_position.get(hashes[i])
+            # i - j == 1 is a null edit, not a revert
+            if j is not None and 1 < i - j <= lookback and (max_age is None or times[i] - times[j] <= max_age):
+                restored[i] = j
+                undone = undone_by[j + 1 : i]
+                undone[undone == -1] = i
+            last_position[hashes[i]] = i
+        stage.add("revisions", n)
+
+    revision_ids = df["revision_id"].to_numpy(dtype=object)
+    is_revert = restored >= 0
+    is_reverted = undone_by >= 0
+    editors = df["editor"].to_numpy(dtype=object)
+    reverter = np.where(is_reverted, editors[np.maximum(undone_by, 0)], None)
+
+    df["is_revert"] = is_revert
+    df["reverts_to"] = np.where(is_revert, revision_ids[np.maximum(restored, 0)], None)
+    df["reverted_edits"] = np.where(is_revert, np.arange(n) - restored - 1, 0)
+    df["is_reverted"] = is_reverted
+    df["reverted_by"] = np.where(is_reverted, revision_ids[np.maximum(undone_by, 0)], None)
+    df["self_reverted"] = is_reverted & df["editor"].notna().to_numpy() & (reverter == editors)
+    df["time_to_revert"] = pd.Series(times[np.maximum(undone_by, 0)] - times).where(is_reverted)
+    df["bytes_delta"] = df["bytes"].diff().fillna(df["bytes"]).astype("int64")
+    return df
+
+
+def _reverted_edits(flags: pd.DataFrame) -> pd.DataFrame:
+    """One row per edit undone by someone else: reverter, reverted editor, revert time."""
+    reverts = flags.loc[flags["is_revert"], ["revision_id", "timestamp", "editor"]]
+    reverts = reverts.rename(columns={"revision_id": "reverted_by", "timestamp": "reverted_at", "editor": "reverter"})
+    undone = flags.loc[flags["is_reverted"], ["revision_id", "reverted_by", "editor"]]
+    pairs = undone.rename(columns={"editor": "reverted"}).merge(reverts, on="reverted_by")
+    pairs = pairs[pairs["reverter"].notna() & pairs["reverted"].notna() & (pairs["reverter"] != pairs["reverted"])]
+    return pairs.reset_index(drop=True)
+
+
+def revert_pairs(flags: pd.DataFrame) -> pd.DataFrame:
+    """Reverter -> reverted editor counts; ``mutual`` marks pairs that reverted each other."""
+    pairs = _reverted_edits(flags)
+    table = pairs.groupby(["reverter", "reverted"], as_index=False).agg(
+        reverts=("reverted_by", "nunique"),
+        edits_reverted=("revision_id", "count"),
+        first=("reverted_at", "min"),
+        last=("reverted_at", "max"),
+    )
+    directed = set(zip(table["reverter"], table["reverted"]))
+    table["mutual"] = [(b, a) in directed for a, b in zip(table["reverter"], table["reverted"])]
+    return table.sort_values("reverts", ascending=False, ignore_index=True)
+
+
+def revert_chains(flags: pd.DataFrame, max_gap: str = "1D") -> pd.DataFrame:
+    """
+    Chains of reverts where each reverter was reverted by the previous revert,
+    at most ``max_gap`` apart. Adds a ``chain_id`` column to ``flags``
+    (-1 outside chains) and returns one row per chain of two or more reverts.
+    """
+    max_gap = pd.Timedelta(max_gap)
+    pairs = _reverted_edits(flags)
+    victims = pairs.groupby("reverted_by")["reverted"].agg(set)
+    reverts = flags.loc[flags["is_revert"], ["revision_id", "timestamp", "editor"]]
+
+    chain_ids = pd.Series(-1, index=flags.index)
+    rows = []
+    chain, previous = [], None
+    for index, revision_id, timestamp, editor in reverts.itertuples(name=None):
+        if (
+            previous is not None
+            and editor in victims.get(previous[1], ())
+            and timestamp - previous[2] <= max_gap
+        ):
+            chain.append((index, revision_id, timestamp, editor))
+        else:
+            if len(chain) > 1:
+                rows.append(chain)
+            chain = [(index, revision_id, timestamp, editor)]
+        previous = (index, revision_id, timestamp)
+    if len(chain) > 1:
+        rows.append(chain)
+
+    chains = []
+    for chain_id, chain in enumerate(rows):
+        chain_ids[[index for index, *_ in chain]] = chain_id
+        editors = sorted({editor for *_, editor in chain if editor is not None})
+        chains.append({
+            "chain_id": chain_id,
+            "start": chain[0][2],
+            "end": chain[-1][2],
+            "reverts": len(chain),
+            "editors": "|".join(map(str, editors)),
+        })
+    flags["chain_id"] = chain_ids
+    return pd.DataFrame(chains, columns=["chain_id", "start", "end", "reverts", "editors"])
+
+
+def edit_war_metrics(flags: pd.DataFrame, freq: str = "W") -> pd.DataFrame:
+    """
+    Per window of ``freq``: edits, reverts, reverted edits, revert rate,
+    distinct reverters, mutually reverting editor pairs, reverts in chains
+    (run ``revert_chains`` first) and the controversy score
+    M = E * sum(min(N_a, N_b)) over mutual pairs except the largest one, with
+    N the editors' edit counts in the article and E the editors involved.
+    """
+    window = _naive(flags["timestamp"]).dt.to_period(freq)
+    metrics = pd.DataFrame({
+        "edits": flags.groupby(window).size(),
+        "reverts": flags["is_revert"].groupby(window).sum(),
+        "reverted": flags["is_reverted"].groupby(window).sum(),
+        "reverters": flags["editor"].where(flags["is_revert"]).groupby(window).nunique(),
+    })
+    if "chain_id" in flags:
+        metrics["chain_reverts"] = (flags["chain_id"] >= 0).groupby(window).sum()
+    metrics["revert_rate"] = metrics["reverts"] / metrics["edits"]
+
+    pairs = _reverted_edits(flags)
+    pairs["window"] = _naive(pairs["reverted_at"]).dt.to_period(freq)
+    directed = pairs[["window", "reverter", "reverted"]].drop_duplicates()
+    mutual = directed.merge(
+        directed.rename(columns={"reverter": "reverted", "reverted": "reverter"}), on=["window", "reverter", "reverted"]
+    )
+    mutual = mutual[mutual["reverter"].astype(str) < mutual["reverted"].astype(str)]
+    edit_counts = flags["editor"].value_counts()
+    mutual = mutual.assign(weight=np.minimum(
+        mutual["reverter"].map(edit_counts).to_numpy(), mutual["reverted"].map(edit_counts).to_numpy()
+    ))
+    by_window = mutual.groupby("window")
+    involved = pd.concat([mutual[["window", "reverter"]].rename(columns={"reverter": "editor"}),
+                          mutual[["window", "reverted"]].rename(columns={"reverted": "editor"})])
+    metrics["mutual_pairs"] = by_window.size()
+    metrics["controversy"] = (
+        (by_window["weight"].sum() - by_window["weight"].max()) * involved.groupby("window")["editor"].nunique()
+    )
+    metrics[["mutual_pairs", "controversy"]] = metrics[["mutual_pairs", "controversy"]].fillna(0).astype("int64")
+    metrics.index.name = "window"
+    return metrics.reset_index()
+
+
+def analyse_article(
+    article: str, data_dir, lookback: int = 15, max_age: str = None, max_gap: str = "1D", freq: str = "W"
+) -> tuple:
+    """Flags, pairs, chains and window metrics of one article."""
+    with profiling.stage("reverts", article=article):
+        flags = flag_reverts(load_revisions(article, data_dir), lookback, max_age)
+        chains = revert_chains(flags, max_gap)
+        pairs = revert_pairs(flags)
+        metrics = edit_war_metrics(flags, freq)
+    return flags, pairs, chains, metrics
+
+
+def _analyse_and_save(article, data_dir, params) -> tuple:
+    flags, pairs, chains, metrics = analyse_article(article, data_dir, **params)
+    path = Path(data_dir) / "reverts" / f"{article}.feather"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    flags.assign(time_to_revert=flags["time_to_revert"].dt.total_seconds()).to_feather(path)
+    return pairs, chains, metrics
+
+
+def scan_articles(articles: list, data_dir, workers: int = None, **params) -> dict:
+    """
+    Analyse many articles in parallel. The per-revision flags are written to
+    ``<data_dir>/reverts/<article>.feather``; the pairs, chains and window
+    metrics of all articles are returned as DataFrames with an article column.
+    """
+    outputs = profiling.map_in_workers(_analyse_and_save, [(article, data_dir, params) for article in articles], workers)
+
+    tables = {"pairs": [], "chains": [], "metrics": []}
+    for article, frames in zip(articles, outputs):
+        for name, frame in zip(tables, frames):
+            tables[name].append(frame.assign(article=article))
+    return {
+        name: pd.concat([frame for frame in frames if not frame.empty] or frames, ignore_index=True)
+        for name, frames in tables.items()
+    }
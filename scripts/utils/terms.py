@@ -0,0 +1,137 @@
+"""
+Term frequencies per article and month, for word clouds and vocabulary
+comparisons without re-tokenizing whole articles.
+
+Revisions are streamed in order and tokenized one at a time. For every month
+three counters are kept:
+    snapshot  terms of the last revision of the month (the article as it stood)
+    added     terms added by the month's edits (multiset difference with the
+              previous revision, summed over the month)
+    removed   terms removed by the month's edits
+The pipeline's ``terms`` stage stores them per month and concatenates them to
+``data/terms/<article>.feather`` (columns month, kind, term, count), so any
+window is a filter and a sum over that table.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from .utils import MARKUP_WORDS
+
+KINDS = ("snapshot", "added", "removed")
+
+# references, comments, links and template parameter names carry no content
+MARKUP_PATTERN = re.compile(
+    r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>|<!--.*?-->|https?://[^\s|\]}]+|\|\s*[\w ]+?\s*=",
+    re.DOTALL | re.IGNORECASE,
+)
+TOKEN_PATTERN = re.compile(r"[a-z][a-z'\-]*[a-z]")
+
+
+@lru_cache(maxsize=1)
+def stopwords() -> frozenset:
+    """The word cloud's English stop words plus wiki markup words."""
+    from wordcloud import STOPWORDS
+
+    return frozenset(STOPWORDS) | {word.lower() for word in MARKUP_WORDS}
+
+
+def tokenize(text: str, min_length: int = 3) -> Counter:
+    """Lower-cased word counts of a wikitext, without markup and stop words."""
+    if not text:
+        return Counter()
+    skip = stopwords()
+    tokens = TOKEN_PATTERN.findall(MARKUP_PATTERN.sub(" ", text).lower())
+    return Counter(token for token in tokens if len(token) >= min_length and token not in skip)
+
+
+def term_counts(revisions, baseline: str = None) -> dict:
+    """
+    Merge per-revision term counters into per-month counters.
+
+    ``revisions`` yields (month, sha1, text) in chronological order; ``baseline``
+    is the text of the revision before the first one, if any. Returns
+    month -> {"snapshot", "added", "removed": Counter}. Texts already seen (same
+    sha1, e.g. after a revert) are not tokenized again.
+    """
+    previous = tokenize(baseline)
+    seen = {}
+    months = {}
+    for month, sha1, text in revisions:
+        if sha1 is not None and sha1 in seen:
+            current = seen[sha1]
+        else:
+            current = tokenize(text)
+            if sha1 is not None:
+                if len(seen) >= 64:
+                    seen.pop(next(iter(seen)))
+                seen[sha1] = current
+        counters = months.setdefault(month, {"added": Counter(), "removed": Counter()})
+        counters["added"].update(current - previous)
+        counters["removed"].update(previous - current)
+        counters["snapshot"] = current
+        previous = current
+    return months
+
+
+def to_frame(months: dict, max_terms: int = None) -> pd.DataFrame:
+    """
+    Long table (month, kind, term, count) with every term, so sums over any
+    window are exact. ``max_terms`` keeps only the largest per month and kind,
+    after which windowed sums undercount the terms cut from some months.
+    """
+    rows = [
+        (month, kind, term, count)
+        for month, counters in months.items()
+        for kind in KINDS
+        for term, count in counters.get(kind, Counter()).most_common(max_terms)
+    ]
+    return pd.DataFrame(rows, columns=["month", "kind", "term", "count"])
+
+
+def load_term_counts(article: str, data_dir) -> pd.DataFrame:
+    """The table written by the pipeline's ``terms`` stage."""
+    path = Path(data_dir) / "terms" / f"{article}.feather"
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found, run: wikianalysis terms {article}")
+    return pd.read_feather(path)
+
+
+def frequencies(counts: pd.DataFrame, kind: str = "added", start: str = None, end: str = None) -> dict:
+    """
+    Term -> count for the months ``start`` to ``end`` ("yyyy-mm", inclusive).
+    Added and removed terms are summed over the window; the snapshot is the
+    last month in it.
+    """
+    window = counts[counts["kind"] == kind]
+    if start is not None:
+        window = window[window["month"] >= start]
+    if end is not None:
+        window = window[window["month"] <= end]
+    if window.empty:
+        return {}
+    if kind == "snapshot":
+        window = window[window["month"] == window["month"].max()]
+    return window.groupby("term")["count"].sum().to_dict()
+
+
+def top_terms(counts: pd.DataFrame, window: tuple, baseline: tuple = None, kind: str = "added", top: int = 20) -> pd.DataFrame:
+    """
+    The ``top`` terms of ``window`` (start, end). With a ``baseline`` window
+    the terms are ranked by lift: their share of the window's terms over their
+    share in the baseline (smoothed so terms new in the window rank first).
+    """
+    current = pd.Series(frequencies(counts, kind, *window), dtype="int64")
+    table = pd.DataFrame({"term": current.index, "count": current.to_numpy()})
+    table["share"] = table["count"] / max(current.sum(), 1)
+    if baseline is None:
+        return table.sort_values("count", ascending=False).head(top).reset_index(drop=True)
+    before = pd.Series(frequencies(counts, kind, *baseline), dtype="int64")
+    table["baseline_count"] = table["term"].map(before).fillna(0).astype("int64")
+    table["baseline_share"] = table["baseline_count"] / max(before.sum(), 1)
+    table["lift"] = (table["count"] + 1) / max(current.sum(), 1) / ((table["baseline_count"] + 1) / max(before.sum(), 1))
+    return table.sort_values(["lift", "count"], ascending=False).head(top).reset_index(drop=True)
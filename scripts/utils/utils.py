@@ -1,7 +1,11 @@
+import os
+from difflib import ndiff
 import pyarrow.feather as feather
 import pandas as pd
 import re
 
+from . import profiling
+
 
 # write helper function
 def read_feather_in_chunks(file_path, chunk_size):
@@ -12,42 +16,50 @@ def read_feather_in_chunks(file_path, chunk_size):
         yield df[start : start + chunk_size]
 
 
+@profiling.profiled("read_feather")
 def read_feather_data(file_path, chunk_size=2000):
     chunks = []
     for chunk in read_feather_in_chunks(file_path, chunk_size):
         chunks.append(chunk)
     output = pd.concat(chunks, ignore_index=True)
+    if profiling.is_enabled():
+        profiling.add("bytes_read", os.path.getsize(file_path))
+        profiling.add("revisions", len(output))
     return output
 
 
+# wiki markup and citation words that say nothing about the article
+MARKUP_WORDS = [
+    "url",
+    "https",
+    "org",
+    "cite",
+    "Cite",
+    "status",
+    "archive",
+    "web",
+    "title",
+    "access",
+    "date",
+    "ref",
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+
+@profiling.profiled()
 def preprocess(content):
     # remove unncess characters
-    to_remove = [
-        "url",
-        "https",
-        "org",
-        "cite",
-        "Cite",
-        "status",
-        "archive",
-        "web",
-        "title",
-        "access",
-        "date",
-        "ref",
-        "January",
-        "February",
-        "March",
-        "April",
-        "May",
-        "June",
-        "July",
-        "August",
-        "September",
-        "October",
-        "November",
-        "December",
-    ]
     content = re.sub(r"\\[a-z]+\d*", "", content)
     content = re.sub(r"{|}", "", content)
     content = re.sub(r"\\\'..", "", content)
@@ -55,7 +67,21 @@ def preprocess(content):
     start = content.find("Taylor Alison Swift")
     content = content[start:] if start != -1 else content
 
-    for word in to_remove:
+    for word in MARKUP_WORDS:
         content = content.replace(word, "")
 
     return content
+
+
+def find_text_differences(text1, text2):
+    diff = list(ndiff(text1.split(), text2.split()))
+    added = [word[2:] for word in diff if word.startswith("+ ")]
+    removed = [word[2:] for word in diff if word.startswith("- ")]
+
+    return {"added": added, "removed": removed}
+
+
+def find_text_differences_2(text1, text2):
+    if text1 is None or text2 is None:
+        return {"added": [], "removed": []}
+    return find_text_differences(text1, text2)
@@ -0,0 +1,357 @@
+"""
+Single command line entry point for the project.
+
+    wikianalysis download Taylor_Swift
+    wikianalysis count Taylor_Swift
+    wikianalysis convert --include-text
+    wikianalysis links Taylor_Swift Kanye_West
+    wikianalysis plot Taylor_Swift Kanye_West
+    wikianalysis events Taylor_Swift Kanye_West --methods kleinberg pelt cusum
+    wikianalysis reverts Taylor_Swift Kanye_West --freq W
+    wikianalysis report Taylor_Swift Kanye_West --formats html png
+    wikianalysis terms Taylor_Swift Kanye_West
+    wikianalysis wordcloud Taylor_Swift --start 2016-07 --end 2016-08 --baseline 2016-01 2016-06
+    wikianalysis query edits --articles Taylor_Swift Kanye_West --window week --start 2016-01-01
+    wikianalysis query sql "SELECT article, count(*) AS edits FROM revisions GROUP BY article"
+    wikianalysis pipeline Taylor_Swift Kanye_West --dry-run
+
+Only the standard library is imported up front; each subcommand imports the
+modules it needs when it runs, so ``count`` and ``--help`` start quickly.
+Without installing, run it as ``python scripts/wikianalysis.py``.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import DATA_DIR, OUTPUT_DIR
+
+
+def _enable_profiling(args) -> None:
+    if getattr(args, "profile", False):
+        from utils import profiling
+
+        profiling.enable()
+
+
+def cmd_download(args) -> None:
+    from data_scraper import download_wiki_revisions
+
+    download_wiki_revisions.main(page=args.page, data_dir=args.data_dir)
+
+
+def cmd_count(args) -> None:
+    from data_scraper import download_wiki_revisions
+
+    download_wiki_revisions.main(page=args.page, data_dir=args.data_dir, count_only=True)
+
+
+def cmd_convert(args) -> None:
+    from data_scraper import xml_to_dataframe
+
+    xml_to_dataframe.main(args.data_dir, args.output_dir, args.batch_size, args.include_text)
+
+
+def _run_stages(args, stages: tuple) -> None:
+    from data_scraper.pipeline import PipelineOptions, format_log, run_pipeline
+
+    options = PipelineOptions(
+        data_dir=args.data_dir,
+        output_dir=getattr(args, "output_dir", Path(OUTPUT_DIR)),
+        stages=stages,
+        force=args.force,
+        dry_run=args.dry_run,
+        workers=args.workers,
+    )
+    print(format_log(run_pipeline(args.articles, options), dry_run=args.dry_run))
+
+
+def cmd_links(args) -> None:
+    _run_stages(args, ("links", "edges", "rollups"))
+
+
+def cmd_plot(args) -> None:
+    _run_stages(args, ("table", "figures"))
+
+
+def cmd_terms(args) -> None:
+    _run_stages(args, ("terms",))
+
+
+def cmd_wordcloud(args) -> None:
+    from utils import terms
+    from utils.plot_graphs import plot_top_terms, plot_wordcloud_frequencies, write_plotlyjs
+
+    counts = terms.load_term_counts(args.article, args.data_dir)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    windowed = args.start is not None or args.end is not None or args.kind != "snapshot"
+    if windowed:
+        name = f"{args.article}_{args.kind}_{args.start or 'first'}_{args.end or 'last'}"
+    else:
+        # the background of the report's edits figure
+        name = args.article
+    file_path = args.output_dir / f"{name}_wordcloud.png"
+    plot_wordcloud_frequencies(terms.frequencies(counts, args.kind, args.start, args.end), str(file_path))
+    print(f"Word cloud saved to {file_path}")
+
+    top = terms.top_terms(counts, (args.start, args.end), args.baseline, args.kind, args.top)
+    print(top.to_string(index=False))
+    if args.baseline:
+        title = f"Top {args.kind} terms of {args.article.replace('_', ' ')}, {args.start or 'first'} to {args.end or 'last'}"
+        title += f" vs. {args.baseline[0]} to {args.baseline[1]}"
+        chart = args.output_dir / f"{name}_top_terms.html"
+        write_plotlyjs(str(args.output_dir))
+        plot_top_terms(top, title, x_title="Lift", value="lift", file_path=str(chart), show=False, include_plotlyjs="directory")
+        print(f"Top terms saved to {chart}")
+
+
+def cmd_events(args) -> None:
+    from utils import events
+
+    table = events.scan_articles(
+        args.articles, args.data_dir, freq=args.freq, methods=tuple(args.methods), alpha=args.alpha, workers=args.workers
+    )
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(args.output_dir / "events.csv", index=False)
+    for article in args.articles:
+        rows = table[table["article"] == article].to_dict("records")
+        monthly = events.edit_counts(events.load_timestamps(article, args.data_dir), "M")
+        annotations = events.to_annotations(rows, monthly, top=args.top)
+        path = args.output_dir / f"{article}_annotations.json"
+        path.write_text(json.dumps(annotations, indent=1), encoding="utf-8")
+        print(f"{article}: {len(rows)} events, annotations saved to {path}")
+        for annotation in annotations:
+            print(f"  {annotation['text']}")
+    print(f"Events saved to {args.output_dir / 'events.csv'}")
+
+
+def cmd_reverts(args) -> None:
+    from utils import reverts
+
+    tables = reverts.scan_articles(
+        args.articles,
+        args.data_dir,
+        workers=args.workers,
+        lookback=args.lookback,
+        max_age=args.max_age,
+        max_gap=args.max_gap,
+        freq=args.freq,
+    )
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    for name, file_name in (("metrics", "edit_wars.csv"), ("pairs", "revert_pairs.csv"), ("chains", "revert_chains.csv")):
+        tables[name].to_csv(args.output_dir / file_name, index=False)
+    metrics = tables["metrics"]
+    for article in args.articles:
+        rows = metrics[metrics["article"] == article]
+        chains = tables["chains"][tables["chains"]["article"] == article]
+        print(
+            f"{article}: {rows['edits'].sum()} revisions, {rows['reverts'].sum()} reverts, "
+            f"{rows['reverted'].sum()} reverted edits, {len(chains)} revert chains"
+        )
+    print(f"Revert flags saved to {args.data_dir / 'reverts'}, metrics to {args.output_dir / 'edit_wars.csv'}")
+
+
+def cmd_report(args) -> None:
+    from utils import report
+
+    written = report.render_reports(
+        args.articles,
+        args.data_dir,
+        args.output_dir,
+        figures=tuple(args.figures),
+        formats=tuple(args.formats),
+        freq=args.freq,
+        max_points=args.max_points,
+        workers=args.workers,
+    )
+    for article, files in written.items():
+        print(f"{article}: {len(files)} files")
+    print(f"Figures saved to {args.output_dir / 'reports'}")
+
+
+def cmd_query(args) -> None:
+    from utils import profiling, query
+
+    options = {"threads": args.threads, "memory_limit": args.memory_limit, "temp_directory": args.temp_dir}
+    if args.query == "parquet":
+        print(f"Edges saved to {query.write_edge_parquet(args.data_dir, **options)}")
+        return
+    if args.query == "sql" and not args.statement:
+        raise SystemExit("query sql needs a statement")
+    with query.Corpus(args.data_dir, **options) as corpus:
+        if args.query == "edits":
+            relation = corpus.edits_per_window(args.window, args.articles, args.start, args.end, output="relation")
+        elif args.query == "editors":
+            relation = corpus.editor_shares(args.articles, args.start, args.end, args.top, output="relation")
+        elif args.query == "edges":
+            relation = corpus.edge_aggregates(args.cutoff, args.start, args.link_type, output="relation")
+        elif args.query == "new-edges":
+            relation = corpus.new_edges(args.cutoff, args.days, output="relation")
+        else:
+            relation = corpus.sql(args.statement, output="relation")
+        with profiling.stage("query", query=args.query):
+            if args.output is None:
+                print(relation.limit(args.rows).df().to_string(index=False))
+                return
+            # written by DuckDB straight from the scan, without a DataFrame in between
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            if args.output.suffix == ".parquet":
+                relation.write_parquet(str(args.output))
+            else:
+                relation.write_csv(str(args.output))
+    print(f"Result saved to {args.output}")
+
+
+def cmd_pipeline(args) -> None:
+    from data_scraper import pipeline
+
+    # a "--" separator before the pipeline arguments is accepted but not needed
+    pipeline_args = args.pipeline_args[1:] if args.pipeline_args[:1] == ["--"] else args.pipeline_args
+    pipeline.main(pipeline_args, prog="wikianalysis pipeline")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="wikianalysis",
+        description="Download, convert and analyse Wikipedia revision histories",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_parser(name, handler, help_text):
+        sub = subparsers.add_parser(
+            name, help=help_text, description=help_text, formatter_class=argparse.ArgumentDefaultsHelpFormatter
+        )
+        sub.set_defaults(handler=handler)
+        return sub
+
+    def add_profile(sub):
+        sub.add_argument(
+            "--profile",
+            action="store_true",
+            help="Write a timing/memory report to output/profiling (or $WIKI_PROFILE_DIR)",
+        )
+
+    def add_stage_options(sub):
+        sub.add_argument("articles", nargs="+", help="Titles of the Wikipedia pages")
+        sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory for revisions, tables and caches")
+        sub.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Articles processed in parallel")
+        sub.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+        sub.add_argument("--dry-run", action="store_true", help="Only show what would be rebuilt")
+        add_profile(sub)
+
+    sub = add_parser("download", cmd_download, "Download all revisions of a page")
+    sub.add_argument("page", help="Title of the Wikipedia page")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory to store the revision data")
+    add_profile(sub)
+
+    sub = add_parser("count", cmd_count, "Count the stored revisions of a page")
+    sub.add_argument("page", help="Title of the Wikipedia page")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory with the revision data")
+
+    sub = add_parser("convert", cmd_convert, "Convert stored revisions to one Feather file per article")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory containing article revision directories")
+    sub.add_argument("--output-dir", type=Path, default=Path(DATA_DIR) / "DataFrames", help="Directory to save DataFrame files")
+    sub.add_argument("--batch-size", type=int, default=1000, help="Number of files to process in each batch")
+    sub.add_argument("--include-text", action="store_true", help="Include full text content in the DataFrame")
+    add_profile(sub)
+
+    sub = add_parser("links", cmd_links, "Extract links and build the Gephi node/edge tables")
+    add_stage_options(sub)
+
+    sub = add_parser("plot", cmd_plot, "Render the revisions-over-time figure per article")
+    add_stage_options(sub)
+    sub.add_argument("--output-dir", type=Path, default=Path(OUTPUT_DIR), help="Directory for figures")
+
+    sub = add_parser("events", cmd_events, "Detect edit bursts and edit-rate changes per article")
+    sub.add_argument("articles", nargs="+", help="Titles of the Wikipedia pages (tables in <data-dir>/DataFrames)")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory with the revision tables")
+    sub.add_argument("--output-dir", type=Path, default=Path(OUTPUT_DIR), help="Directory for events.csv and <article>_annotations.json")
+    sub.add_argument("--methods", nargs="+", choices=["kleinberg", "pelt", "cusum"], default=["kleinberg", "pelt"], help="Detectors; cusum keeps its state in <data-dir>/cache and only reads new edits")
+    sub.add_argument("--freq", default="D", help="Period the edits are counted in (pandas period alias: h, D, W, M)")
+    sub.add_argument("--alpha", type=float, default=0.01, help="Keep events with a p-value below this")
+    sub.add_argument("--top", type=int, default=5, help="Annotations per article")
+    sub.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Articles processed in parallel")
+    add_profile(sub)
+
+    sub = add_parser("reverts", cmd_reverts, "Find identity reverts, revert chains and edit wars from revision hashes")
+    sub.add_argument("articles", nargs="+", help="Titles of the Wikipedia pages (tables in <data-dir>/DataFrames)")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory with the revision tables")
+    sub.add_argument("--output-dir", type=Path, default=Path(OUTPUT_DIR), help="Directory for edit_wars.csv, revert_pairs.csv and revert_chains.csv")
+    sub.add_argument("--lookback", type=int, default=15, help="How many revisions back a revert may restore")
+    sub.add_argument("--max-age", default=None, help="How old the restored revision may be (e.g. 2D)")
+    sub.add_argument("--max-gap", default="1D", help="Longest pause inside a revert chain")
+    sub.add_argument("--freq", default="W", help="Window of the edit-war metrics (pandas period alias)")
+    sub.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Articles processed in parallel")
+    add_profile(sub)
+
+    sub = add_parser("terms", cmd_terms, "Count the terms of every month's text and edits (for wordcloud)")
+    add_stage_options(sub)
+
+    sub = add_parser("wordcloud", cmd_wordcloud, "Word cloud and top terms of an article for a window of months")
+    sub.add_argument("article", help="Title of the Wikipedia page (run terms first)")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory with <data-dir>/terms")
+    sub.add_argument("--output-dir", type=Path, default=Path(OUTPUT_DIR), help="Directory for the figures")
+    sub.add_argument("--kind", choices=["snapshot", "added", "removed"], default="snapshot", help="Terms of the text at the end of the window, or added/removed by its edits")
+    sub.add_argument("--start", default=None, help="First month of the window (yyyy-mm)")
+    sub.add_argument("--end", default=None, help="Last month of the window (yyyy-mm)")
+    sub.add_argument("--baseline", nargs=2, metavar=("START", "END"), default=None, help="Rank terms by lift over this window of months")
+    sub.add_argument("--top", type=int, default=20, help="Terms in the top terms table")
+    add_profile(sub)
+
+    sub = add_parser("report", cmd_report, "Render the figures of many articles without a display")
+    sub.add_argument("articles", nargs="+", help="Titles of the Wikipedia pages (tables in <data-dir>/DataFrames)")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory with the revision tables")
+    sub.add_argument("--output-dir", type=Path, default=Path(OUTPUT_DIR), help="Figures go to <output-dir>/reports")
+    sub.add_argument("--figures", nargs="+", choices=["edits", "monthly", "reverts"], default=["edits", "monthly", "reverts"], help="Figures per article")
+    sub.add_argument("--formats", nargs="+", choices=["html", "png"], default=["html"], help="Output formats (png needs kaleido)")
+    sub.add_argument("--freq", default="D", help="Period of the edits figure (pandas period alias: h, D, W)")
+    sub.add_argument("--max-points", type=int, default=4000, help="Points per trace after min/max downsampling")
+    sub.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Articles rendered in parallel")
+    add_profile(sub)
+
+    sub = add_parser("query", cmd_query, "SQL over the revision tables and edge files of all articles, out of core (needs duckdb)")
+    sub.add_argument("query", choices=["edits", "editors", "edges", "new-edges", "sql", "parquet"], help="Ready-made query, sql for your own, or parquet to copy edge.csv to edge.parquet")
+    sub.add_argument("statement", nargs="?", default=None, help="SQL over the revisions, edges and nodes views (query sql)")
+    sub.add_argument("--data-dir", type=Path, default=Path(DATA_DIR), help="Directory with DataFrames/ and network/")
+    sub.add_argument("--articles", nargs="+", default=None, help="Only these articles (default: all tables in <data-dir>/DataFrames)")
+    sub.add_argument("--window", choices=["hour", "day", "week", "month", "quarter", "year"], default="month", help="Window of the edits query")
+    sub.add_argument("--start", default=None, help="Only edits or links from this date")
+    sub.add_argument("--end", default=None, help="Only edits up to this date")
+    sub.add_argument("--top", type=int, default=10, help="Editors per article")
+    sub.add_argument("--cutoff", default="2012-07-01", help="Last date of the edges query, first date of new-edges")
+    sub.add_argument("--days", type=int, default=30, help="Days after --cutoff for new-edges")
+    sub.add_argument("--link-type", default=None, help="Only this link type in the edges query (e.g. internal)")
+    sub.add_argument("--output", type=Path, default=None, help="Write the full result to a .csv or .parquet file instead of printing it")
+    sub.add_argument("--rows", type=int, default=20, help="Rows printed without --output")
+    sub.add_argument("--threads", type=int, default=None, help="DuckDB threads (default: all cores)")
+    sub.add_argument("--memory-limit", default=None, help="DuckDB memory limit, e.g. 4GB; larger intermediates spill to disk")
+    sub.add_argument("--temp-dir", type=Path, default=None, help="Where DuckDB spills")
+    add_profile(sub)
+
+    # every argument after "pipeline", options included, goes to pipeline.py (see main)
+    subparsers.add_parser(
+        "pipeline",
+        add_help=False,
+        help="Run the cached pipeline; arguments as for pipeline.py (wikianalysis pipeline --help)",
+    ).set_defaults(handler=cmd_pipeline)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "pipeline":
+        args.pipeline_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    _enable_profiling(args)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()